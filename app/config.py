@@ -64,6 +64,11 @@ class Settings(BaseSettings):
     model_name: str = "paraphrase-multilingual-MiniLM-L12-v2"
     matching_threshold: float = 0.80
     
+    # Perfilado bajo demanda (?profile=1 con header X-Profile-Token)
+    # Requiere pyinstrument; dejar token vacío lo desactiva aunque esté habilitado
+    profiling_enabled: bool = False
+    profiling_token: str = ""
+    
     # Entorno
     environment: str = "development"
     testing: bool = False  # Bandera para modo testing
@@ -49,64 +49,180 @@ class Database:
     
     @classmethod
     async def create_indexes(cls):
-        """Crear índices en las colecciones para mejor rendimiento"""
+        """Crear índices en las colecciones"""
+        await cls.create_required_indexes()
+        await cls.create_performance_indexes()
+        logger.info("✓ Índices de MongoDB creados exitosamente")
+    
+    @classmethod
+    async def create_required_indexes(cls):
+        """
+        Índices de los que depende la lógica de la aplicación (unicidad y TTL)
+        
+        Sin try: si alguno falla, connect_db lo propaga y la app no arranca
+        """
+        # Usuarios: email y username únicos (registro detecta duplicados por el índice)
+        await cls.database.users.create_index("email", unique=True)
+        await cls.database.users.create_index("username", unique=True)
+        
+        # Una matrícula por estudiante y un RFC por empresa
+        await cls.database.students.create_index("matricula", unique=True)
+        await cls.database.companies.create_index("rfc", unique=True)
+        
+        # Un match por vacante/estudiante (insert_many de matching descarta repetidos)
+        await cls.database.matches.create_index([
+            ("vacancy_id", 1),
+            ("student_matricula", 1)
+        ], unique=True)
+        
+        # Una solicitud por empresa/vacante/estudiante (también sirve a consultas por vacancy_id)
+        await cls.check_contact_request_duplicates()
+        await cls.database.contact_requests.create_index([
+            ("vacancy_id", 1),
+            ("student_matricula", 1),
+            ("company_id", 1)
+        ], unique=True)
+        
+        # Refresh tokens: jti único para persistir y revocar
+        await cls.database.refresh_tokens.create_index("jti", unique=True)
+        # TTL: MongoDB borra cada token al llegar a su expires_at
+        # (al revocar se adelanta expires_at para purgarlo de inmediato)
+        await cls.database.refresh_tokens.create_index("expires_at", expireAfterSeconds=0)
+    
+    @classmethod
+    async def check_contact_request_duplicates(cls):
+        """
+        Verificar que no haya solicitudes repetidas antes de crear el índice único
+        
+        No borra nada: si hay duplicados aborta el arranque listando cada
+        (vacante, estudiante, empresa) para que se depuren a mano
+        """
+        pipeline = [
+            {"$group": {
+                "_id": {
+                    "vacancy_id": "$vacancy_id",
+                    "student_matricula": "$student_matricula",
+                    "company_id": "$company_id"
+                },
+                "count": {"$sum": 1}
+            }},
+            {"$match": {"count": {"$gt": 1}}}
+        ]
+        
+        duplicates = [
+            f"(vacancy_id={g['_id'].get('vacancy_id')}, "
+            f"student_matricula={g['_id'].get('student_matricula')}, "
+            f"company_id={g['_id'].get('company_id')}): {g['count']}"
+            async for g in cls.database.contact_requests.aggregate(pipeline, allowDiskUse=True)
+        ]
+        
+        if duplicates:
+            raise RuntimeError(
+                "Solicitudes de contacto duplicadas; depúralas antes de arrancar:\n"
+                + "\n".join(duplicates)
+            )
+    
+    @classmethod
+    async def create_performance_indexes(cls):
+        """Índices de consulta; si uno falla se registra y se siguen creando los demás"""
+        # Índices para colección de usuarios
+        await cls._create_index(cls.database.users, "role")
+        
+        # Índices para colección de estudiantes
+        await cls._create_index(cls.database.students, "user_id")
+        await cls._create_index(cls.database.students, "carrera")
+        await cls._create_index(cls.database.students, "semestre")
+        # Búsqueda de perfiles visibles por carrera/semestre
+        await cls._create_index(cls.database.students, [
+            ("visible_empresas", 1),
+            ("carrera", 1),
+            ("semestre", 1)
+        ])
+        
+        # Embeddings de estudiantes (_id = _id del estudiante)
+        # Localizar los generados con un modelo anterior para regenerarlos
+        await cls._create_index(cls.database.student_embeddings, "model_version")
+        
+        # Índices para colección de empresas
+        await cls._create_index(cls.database.companies, "user_id")
+        # Listado admin por verificación con paginación por _id
+        await cls._create_index(cls.database.companies, [
+            ("verificada", 1),
+            ("_id", 1)
+        ])
+        
+        # Índices para colección de vacantes
+        # (los compuestos también sirven a consultas por company_id o estado solos)
+        await cls._create_index(cls.database.vacancies, [
+            ("company_id", 1),
+            ("estado", 1)
+        ])
+        await cls._create_index(cls.database.vacancies, [
+            ("estado", 1),
+            ("fecha_publicacion", -1)
+        ])
+        await cls._create_index(cls.database.vacancies, "fecha_publicacion")
+        
+        # Índices para colección de matches
+        await cls._create_index(cls.database.matches, "porcentaje_match")
+        # Listado de candidatos por vacante filtrado/ordenado por porcentaje
+        await cls._create_index(cls.database.matches, [
+            ("vacancy_id", 1),
+            ("porcentaje_match", -1)
+        ])
+        # Matches de un estudiante (recientes primero / actualizar su snapshot)
+        await cls._create_index(cls.database.matches, [
+            ("student_matricula", 1),
+            ("fecha_match", -1)
+        ])
+        
+        # Índices para colección de solicitudes de contacto
+        await cls._create_index(cls.database.contact_requests, "student_matricula")
+        # Solicitudes de una empresa por estado, recientes primero
+        await cls._create_index(cls.database.contact_requests, [
+            ("company_id", 1),
+            ("estado", 1),
+            ("fecha_solicitud", -1)
+        ])
+        await cls._create_index(cls.database.contact_requests, "estado")
+        
+        # Índices para colección de mensajes
+        await cls._create_index(cls.database.messages, [
+            ("student_id", 1),
+            ("fecha_envio", -1)
+        ])
+        await cls._create_index(cls.database.messages, "fecha_envio")
+        # Bandeja del admin por estado/prioridad y contadores de pendientes
+        await cls._create_index(cls.database.messages, [
+            ("estado", 1),
+            ("prioridad", 1),
+            ("fecha_envio", -1)
+        ])
+        await cls._create_index(cls.database.messages, [
+            ("leido", 1),
+            ("respondido", 1)
+        ])
+        
+        # Índices para colección de audit logs
+        await cls._create_index(cls.database.audit_logs, "user_id")
+        await cls._create_index(cls.database.audit_logs, "timestamp")
+        await cls._create_index(cls.database.audit_logs, "event_type")
+        
+        # Índices para colección de alertas de seguridad
+        await cls._create_index(cls.database.security_alerts, "timestamp")
+        await cls._create_index(cls.database.security_alerts, "status")
+        await cls._create_index(cls.database.security_alerts, "severity")
+
+        # Índices para colección de refresh tokens
+        await cls._create_index(cls.database.refresh_tokens, "user_id")
+    
+    @classmethod
+    async def _create_index(cls, collection, keys, **kwargs):
+        """create_index que solo registra el error (índices de rendimiento)"""
         try:
-            # Índices para colección de usuarios
-            await cls.database.users.create_index("email", unique=True)
-            await cls.database.users.create_index("username", unique=True)
-            await cls.database.users.create_index("role")
-            
-            # Índices para colección de estudiantes
-            await cls.database.students.create_index("matricula", unique=True)
-            await cls.database.students.create_index("user_id")
-            await cls.database.students.create_index("carrera")
-            await cls.database.students.create_index("semestre")
-            
-            # Índices para colección de empresas
-            await cls.database.companies.create_index("user_id")
-            await cls.database.companies.create_index("rfc", unique=True)
-            
-            # Índices para colección de vacantes
-            await cls.database.vacancies.create_index("company_id")
-            await cls.database.vacancies.create_index("estado")
-            await cls.database.vacancies.create_index("fecha_publicacion")
-            
-            # Índices para colección de matches
-            await cls.database.matches.create_index([
-                ("vacancy_id", 1),
-                ("student_matricula", 1)
-            ], unique=True)
-            await cls.database.matches.create_index("porcentaje_match")
-            
-            # Índices para colección de solicitudes de contacto
-            await cls.database.contact_requests.create_index("vacancy_id")
-            await cls.database.contact_requests.create_index("student_matricula")
-            await cls.database.contact_requests.create_index("estado")
-            
-            # Índices para colección de mensajes
-            await cls.database.messages.create_index("student_id")
-            await cls.database.messages.create_index("fecha_envio")
-            await cls.database.messages.create_index("leido")
-            
-            # Índices para colección de audit logs
-            await cls.database.audit_logs.create_index("user_id")
-            await cls.database.audit_logs.create_index("timestamp")
-            await cls.database.audit_logs.create_index("event_type")
-            
-            # Índices para colección de alertas de seguridad
-            await cls.database.security_alerts.create_index("timestamp")
-            await cls.database.security_alerts.create_index("status")
-            await cls.database.security_alerts.create_index("severity")
-
-            # Índices para colección de refresh tokens
-            # Usado para persistir y revocar refresh tokens (jti)
-            await cls.database.refresh_tokens.create_index("jti", unique=True)
-            await cls.database.refresh_tokens.create_index("user_id")
-            
-            logger.info("✓ Índices de MongoDB creados exitosamente")
-            
+            await collection.create_index(keys, **kwargs)
         except Exception as e:
-            logger.warning(f"Advertencia al crear índices: {e}")
+            logger.warning(f"Advertencia al crear índice {collection.name} {keys}: {e}")
     
     @classmethod
     def get_database(cls) -> AsyncIOMotorDatabase:
@@ -138,6 +254,11 @@ async def get_students_collection():
     return await get_collection("students")
 
 
+async def get_student_embeddings_collection():
+    """Colección de embeddings de perfiles de estudiantes"""
+    return await get_collection("student_embeddings")
+
+
 async def get_companies_collection():
     """Colección de empresas"""
     return await get_collection("companies")
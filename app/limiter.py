@@ -24,7 +24,14 @@ def init_limiter(app):
     aplicar los decoradores `@limiter.limit(...)`. Por eso la configuración
     (usar Redis o no) se aplica en el momento en que se importa este módulo.
     Esta función solo registra el middleware y el manejador 429 en la app.
+    Es idempotente: llamadas repetidas sobre la misma app (p. ej. con
+    --reload o fixtures de tests) no apilan el middleware.
     """
+    if getattr(app.state, "_limiter_initialized", False):
+        logger.debug("Rate limiter ya inicializado; se omite")
+        return
+    app.state._limiter_initialized = True
+
     # Registrar en el estado de la app para que routers puedan acceder si es necesario
     app.state.limiter = limiter
 
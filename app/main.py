@@ -5,15 +5,27 @@ FastAPI application con todos los routers configurados
 from app.routers import auth, students, companies, vacancies, matching, contact_requests
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, Response
+from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
+from typing import Optional
+import asyncio
+import importlib.util
 import logging
-import time
-from datetime import datetime
-import os
+import orjson
+from datetime import datetime, timezone
+from pathlib import Path
 
 from app.config import settings
+from app.limiter import init_limiter
+from app.middleware import CombinedRequestMiddleware, ProfilerMiddleware
+
+# Valores de configuración usados por petición, resueltos una sola vez
+IS_PROD = settings.environment == "production"
+TESTING = settings.testing
+ALLOWED_ORIGINS = tuple(settings.allowed_origins_list)
 
 
 # Validación de settings críticos en entornos de producción
@@ -51,8 +63,10 @@ def _validate_critical_settings():
 _validate_critical_settings()
 from app.database import db
 
-# Importar routers
-from app.routers import auth, students, companies, vacancies, matching
+def _json_bytes(content) -> bytes:
+    """Serializar a JSON igual que ORJSONResponse (para respuestas pre-calculadas)"""
+    return orjson.dumps(content)
+
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -62,19 +76,33 @@ logger = logging.getLogger(__name__)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Gestiona el ciclo de vida de la aplicación"""
+    logger.info("=" * 60)
+    logger.info("🎓 API de Vinculación Inteligente")
+    logger.info(f"🏫 Universidad: {settings.university_name}")
+    logger.info(f"🌍 Entorno: {settings.environment}")
+    logger.info(f"📡 Host: {settings.api_host}:{settings.api_port}")
+    logger.info(f"📚 Docs: http://localhost:{settings.api_port}/docs")
+    logger.info("=" * 60)
     logger.info("🚀 Iniciando aplicación...")
-    logger.info(f"Entorno: {settings.environment}")
-    logger.info(f"Universidad: {settings.university_name}")
     
     # Conectar a MongoDB solo si no estamos en modo test
-    if not settings.testing:
+    health_task = None
+    if not TESTING:
         await db.connect_db()
+        health_task = asyncio.create_task(_health_refresher())
     
     # Crear directorios necesarios
-    os.makedirs(settings.upload_dir, exist_ok=True)
-    os.makedirs(os.path.join(settings.upload_dir, "cvs"), exist_ok=True)
-    os.makedirs(os.path.join(settings.upload_dir, "logos"), exist_ok=True)
-    os.makedirs("logs", exist_ok=True)
+    upload_dir = Path(settings.upload_dir)
+    # (parents=True crea upload_dir junto con sus subdirectorios)
+    for path in (upload_dir / "cvs", upload_dir / "logos", Path("logs")):
+        path.mkdir(parents=True, exist_ok=True)
+    
+    # Generar el esquema OpenAPI ahora y no en la primera petición a /docs;
+    # si falla, la API arranca igual y /openapi.json lo reintenta al pedirse
+    try:
+        _build_openapi_cache()
+    except Exception as e:
+        logger.warning(f"No se pudo generar el esquema OpenAPI al arrancar: {e}")
     
     logger.info("✓ Aplicación lista para recibir peticiones")
     
@@ -82,7 +110,12 @@ async def lifespan(app: FastAPI):
     
     # Shutdown - cerrar BD solo si no estamos en modo test
     logger.info("🛑 Cerrando aplicación...")
-    if not settings.testing:
+    if health_task is not None:
+        # Esperar la cancelación antes de cerrar el cliente que usa el refresco
+        health_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await health_task
+    if not TESTING:
         await db.close_db()
     logger.info("✓ Aplicación cerrada correctamente")
 
@@ -114,11 +147,22 @@ app = FastAPI(
         "name": settings.university_name,
         "email": settings.university_email,
     },
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+    # /docs, /redoc y /openapi.json se sirven abajo (sección "forzar") con el
+    # esquema pre-serializado; los handlers por defecto lo re-serializan por petición
+    openapi_url=None,
+    docs_url=None,
+    redoc_url=None
 )
 
-# Inicializar rate limiter (slowapi)
-from app.limiter import init_limiter
+# Compresión gzip para respuestas de 1KB o más. Se registra primero (capa más
+# interna) para que reciba el cuerpo completo de la ruta: SlowAPIMiddleware
+# re-emite la respuesta en chunks y, por fuera de él, gzip comprimiría en modo
+# streaming cualquier respuesta sin importar su tamaño.
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
+# Inicializar rate limiter (slowapi) antes del resto de middlewares
 init_limiter(app)
 
 # ============= MIDDLEWARES =============
@@ -126,71 +170,24 @@ init_limiter(app)
 # CORS
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=settings.allowed_origins_list,
+    allow_origins=ALLOWED_ORIGINS,
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH"],
-    allow_headers=["*"],
-    max_age=3600,
+    allow_headers=["Authorization", "Content-Type", "X-Requested-With"],
+    expose_headers=["X-Next-Cursor"],  # Cursor de paginación de /api/companies/
+    max_age=86400,  # Cachear preflight (OPTIONS) hasta el máximo permitido por navegadores
 )
 
-# Middleware de seguridad - Headers
-@app.middleware("http")
-async def add_security_headers(request: Request, call_next):
-    """Agregar headers de seguridad a todas las respuestas"""
-    response = await call_next(request)
-    
-    # Headers de seguridad según OWASP
-    response.headers["X-Content-Type-Options"] = "nosniff"
-    response.headers["X-Frame-Options"] = "DENY"
-    response.headers["X-XSS-Protection"] = "1; mode=block"
-    response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-    response.headers["Content-Security-Policy"] = "default-src 'self'"
-    response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-    response.headers["Permissions-Policy"] = "geolocation=(), microphone=(), camera=()"
-    
-    return response
-
-# Middleware de logging
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    """Registrar información de cada petición"""
-    start_time = time.time()
-    
-    client_host = request.client.host if request.client else "unknown"
-    logger.info(f"→ {request.method} {request.url.path} - IP: {client_host}")
-    
-    response = await call_next(request)
-    
-    process_time = time.time() - start_time
-    response.headers["X-Process-Time"] = str(process_time)
-    
-    logger.info(
-        f"← {request.method} {request.url.path} - "
-        f"Status: {response.status_code} - "
-        f"Time: {process_time:.3f}s"
-    )
-    
-    return response
+# Límite de tamaño, logging y headers de seguridad en una sola capa
+app.add_middleware(CombinedRequestMiddleware)
 
-# Middleware de validación de tamaño
-@app.middleware("http")
-async def limit_request_size(request: Request, call_next):
-    """Limitar tamaño de peticiones"""
-    content_length = request.headers.get("content-length")
-    
-    if content_length:
-        content_length = int(content_length)
-        max_size = settings.max_file_size_bytes * 2
-        
-        if content_length > max_size:
-            return JSONResponse(
-                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                content={
-                    "detail": f"Request demasiado grande. Máximo: {settings.max_file_size_mb * 2}MB"
-                }
-            )
-    
-    return await call_next(request)
+# Perfilado bajo demanda (capa más externa para medir toda la petición)
+# (pyinstrument es opcional: si no está instalado se avisa y se arranca sin perfilado)
+if settings.profiling_enabled:
+    if importlib.util.find_spec("pyinstrument") is None:
+        logger.warning("profiling_enabled sin pyinstrument instalado; perfilado desactivado")
+    else:
+        app.add_middleware(ProfilerMiddleware)
 
 # ============= EXCEPTION HANDLERS =============
 
@@ -198,11 +195,11 @@ async def limit_request_size(request: Request, call_next):
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     """Manejar errores de validación"""
     logger.warning(f"Error de validación en {request.url.path}: {exc.errors()}")
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
         content={
             "detail": "Error de validación",
-            "errors": exc.errors()
+            "errors": jsonable_encoder(exc.errors())
         }
     )
 
@@ -211,13 +208,13 @@ async def general_exception_handler(request: Request, exc: Exception):
     """Manejar excepciones generales"""
     logger.error(f"Error en {request.url.path}: {str(exc)}", exc_info=True)
     
-    if settings.environment == "production":
-        return JSONResponse(
+    if IS_PROD:
+        return ORJSONResponse(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             content={"detail": "Error interno del servidor"}
         )
     else:
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             content={
                 "detail": "Error interno del servidor",
@@ -228,28 +225,39 @@ async def general_exception_handler(request: Request, exc: Exception):
 
 # ============= ENDPOINTS BÁSICOS =============
 
+# Parte estática de la respuesta de "/" (solo cambia el timestamp)
+_ROOT_STATIC = {
+    "message": "API de Vinculación Inteligente",
+    "version": "1.0.0",
+    "status": "online",
+    "university": settings.university_name,
+    "docs": "/docs",
+    "features": [
+        "Matching con IA",
+        "Gestión de perfiles",
+        "Sistema de vacantes",
+        "Autenticación segura",
+        "Dashboard de KPIs"
+    ]
+}
+
 @app.get("/", tags=["General"])
 async def root():
     """Endpoint raíz - Información de la API"""
-    return {
-        "message": "API de Vinculación Inteligente",
-        "version": "1.0.0",
-        "status": "online",
-        "timestamp": datetime.utcnow().isoformat(),
-        "university": settings.university_name,
-        "docs": "/docs",
-        "features": [
-            "Matching con IA",
-            "Gestión de perfiles",
-            "Sistema de vacantes",
-            "Autenticación segura",
-            "Dashboard de KPIs"
-        ]
-    }
-
-@app.get("/health", tags=["General"])
-async def health_check():
-    """Health check - Verificar estado del sistema"""
+    return {**_ROOT_STATIC, "timestamp": datetime.now(timezone.utc).isoformat()}
+
+# Estado de salud cacheado: /health lo lee sin tocar MongoDB en cada sondeo
+# del balanceador; _health_refresher (iniciado en lifespan) lo actualiza.
+HEALTH_CHECK_INTERVAL = 5  # segundos
+_health_state = {
+    "status": "unhealthy",
+    "database": "disconnected",
+    "timestamp": None,
+    "environment": settings.environment
+}
+
+async def _check_database_health():
+    """Hacer ping a MongoDB y actualizar _health_state"""
     try:
         await db.client.admin.command('ping')
         db_status = "connected"
@@ -257,46 +265,60 @@ async def health_check():
         logger.error(f"Error en health check: {e}")
         db_status = "disconnected"
     
-    return {
-        "status": "healthy" if db_status == "connected" else "unhealthy",
-        "database": db_status,
-        "timestamp": datetime.utcnow().isoformat(),
-        "environment": settings.environment
+    _health_state["status"] = "healthy" if db_status == "connected" else "unhealthy"
+    _health_state["database"] = db_status
+    _health_state["timestamp"] = datetime.now(timezone.utc).isoformat()
+
+async def _health_refresher():
+    """Refrescar el estado de salud cada HEALTH_CHECK_INTERVAL segundos"""
+    while True:
+        await _check_database_health()
+        await asyncio.sleep(HEALTH_CHECK_INTERVAL)
+
+@app.get("/health", tags=["General"])
+async def health_check():
+    """Health check - Verificar estado del sistema"""
+    if _health_state["timestamp"] is None:
+        # Sin refresco en segundo plano (p. ej. modo test): verificar ahora
+        await _check_database_health()
+    return _health_state
+
+# Respuesta de /api/info: es constante, se serializa una sola vez
+_API_INFO_BODY = _json_bytes({
+    "name": "API de Vinculación Inteligente",
+    "version": "1.0.0",
+    "description": "Sistema para conectar estudiantes con oportunidades laborales usando IA",
+    "university": settings.university_name,
+    "contact": settings.university_email,
+    "features": [
+        "Matching inteligente con IA (80%+ compatibilidad)",
+        "Análisis automático de CVs",
+        "Sistema de autenticación seguro (OAuth2 + MFA)",
+        "Protección de datos (LFPDPPP)",
+        "Dashboard de KPIs y OKRs",
+        "Gráficas de compatibilidad (Spider Chart)",
+        "Anonimización de datos estudiantiles"
+    ],
+    "security": {
+        "authentication": "OAuth2 + JWT + MFA",
+        "encryption": "TLS 1.3 + AES-256",
+        "compliance": ["OWASP Top 10", "ISO 27001", "LFPDPPP"],
+        "levels": 5
+    },
+    "roles": ["estudiante", "empresa", "admin"],
+    "endpoints": {
+        "auth": "/api/auth",
+        "students": "/api/students",
+        "companies": "/api/companies",
+        "vacancies": "/api/vacancies",
+        "matching": "/api/matching"
     }
+})
 
 @app.get("/api/info", tags=["General"])
 async def api_info():
     """Información detallada de la API"""
-    return {
-        "name": "API de Vinculación Inteligente",
-        "version": "1.0.0",
-        "description": "Sistema para conectar estudiantes con oportunidades laborales usando IA",
-        "university": settings.university_name,
-        "contact": settings.university_email,
-        "features": [
-            "Matching inteligente con IA (80%+ compatibilidad)",
-            "Análisis automático de CVs",
-            "Sistema de autenticación seguro (OAuth2 + MFA)",
-            "Protección de datos (LFPDPPP)",
-            "Dashboard de KPIs y OKRs",
-            "Gráficas de compatibilidad (Spider Chart)",
-            "Anonimización de datos estudiantiles"
-        ],
-        "security": {
-            "authentication": "OAuth2 + JWT + MFA",
-            "encryption": "TLS 1.3 + AES-256",
-            "compliance": ["OWASP Top 10", "ISO 27001", "LFPDPPP"],
-            "levels": 5
-        },
-        "roles": ["estudiante", "empresa", "admin"],
-        "endpoints": {
-            "auth": "/api/auth",
-            "students": "/api/students",
-            "companies": "/api/companies",
-            "vacancies": "/api/vacancies",
-            "matching": "/api/matching"
-        }
-    }
+    return Response(content=_API_INFO_BODY, media_type="application/json")
 
 # ============= REGISTRAR ROUTERS =============
 
@@ -349,7 +371,7 @@ async def list_routes():
     """
     Listar todas las rutas disponibles (solo en desarrollo)
     """
-    if settings.environment == "production":
+    if IS_PROD:
         return {"message": "Not available in production"}
     
     routes = []
@@ -366,24 +388,9 @@ async def list_routes():
         "routes": sorted(routes, key=lambda x: x["path"])
     }
 
-# ============= MENSAJE DE INICIO =============
-
-@app.on_event("startup")
-async def startup_message():
-    """Mensaje al iniciar la aplicación"""
-    logger.info("=" * 60)
-    logger.info("🎓 API de Vinculación Inteligente")
-    logger.info(f"🏫 Universidad: {settings.university_name}")
-    logger.info(f"🌍 Entorno: {settings.environment}")
-    logger.info(f"📡 Host: {settings.api_host}:{settings.api_port}")
-    logger.info(f"📚 Docs: http://localhost:{settings.api_port}/docs")
-    logger.info("=" * 60)
-
 # ============= forzar ==============
 
-from fastapi.openapi.docs import get_swagger_ui_html
-from fastapi.openapi.utils import get_openapi
-from fastapi.responses import JSONResponse
+from fastapi.openapi.docs import get_swagger_ui_html, get_redoc_html
 
 @app.get("/docs", include_in_schema=False)
 async def custom_swagger_ui_html():
@@ -392,17 +399,30 @@ async def custom_swagger_ui_html():
         title="📘 Documentación API Vinculación Inteligente"
     )
 
+@app.get("/redoc", include_in_schema=False)
+async def custom_redoc_html():
+    return get_redoc_html(
+        openapi_url="/openapi.json",
+        title="📘 Documentación API Vinculación Inteligente"
+    )
+
+# Esquema OpenAPI serializado; las rutas no cambian tras el arranque
+_openapi_cache: Optional[bytes] = None
+
+def _build_openapi_cache() -> bytes:
+    """Generar y serializar el esquema OpenAPI (se llama desde lifespan)"""
+    global _openapi_cache
+    if _openapi_cache is None:
+        _openapi_cache = _json_bytes(app.openapi())
+    return _openapi_cache
+
 @app.get("/openapi.json", include_in_schema=False)
 async def get_open_api_endpoint():
     try:
-        return get_openapi(
-            title="API Vinculación Inteligente",
-            version="1.0.0",
-            description="Documentación generada manualmente para resolver conflicto Swagger UI",
-            routes=app.routes
-        )
+        # Normalmente ya generado en el arranque; perezoso si no corrió lifespan
+        return Response(content=_build_openapi_cache(), media_type="application/json")
     except Exception as e:
-        return JSONResponse(content={"error": str(e)}, status_code=500)
+        return ORJSONResponse(content={"error": str(e)}, status_code=500)
 
 
 
@@ -418,5 +438,8 @@ if __name__ == "__main__":
         host=settings.api_host,
         port=settings.api_port,
         reload=settings.debug_mode,
-        log_level=settings.log_level.lower()
+        log_level=settings.log_level.lower(),
+        loop="uvloop",
+        http="httptools",
+        access_log=False  # CombinedRequestMiddleware ya registra cada petición
     )
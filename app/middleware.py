@@ -0,0 +1,154 @@
+"""
+Middlewares ASGI de la aplicación
+Implementados como ASGI puro para evitar el costo de BaseHTTPMiddleware
+(task group + Request/Response por petición)
+"""
+import hmac
+import logging
+import time
+from urllib.parse import parse_qs
+
+import orjson
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Headers de seguridad según OWASP, codificados una sola vez (inmutables para
+# que ningún middleware pueda modificarlos accidentalmente al extender headers)
+_SEC_HEADERS_RAW = (
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"strict-transport-security", b"max-age=31536000; includeSubDomains"),
+    (b"content-security-policy", b"default-src 'self'"),
+    (b"referrer-policy", b"strict-origin-when-cross-origin"),
+    (b"permissions-policy", b"geolocation=(), microphone=(), camera=()"),
+)
+
+
+# Respuesta 413 invariante, construida una sola vez al importar
+_MAX_BODY = settings.max_file_size_bytes * 2
+_OVERSIZE_BODY = orjson.dumps(
+    {"detail": f"Request demasiado grande. Máximo: {settings.max_file_size_mb * 2}MB"}
+)
+_OVERSIZE_START = {
+    "type": "http.response.start",
+    "status": 413,
+    "headers": (
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(_OVERSIZE_BODY)).encode()),
+    ),
+}
+_OVERSIZE_BODY_MESSAGE = {"type": "http.response.body", "body": _OVERSIZE_BODY}
+
+
+class CombinedRequestMiddleware:
+    """Límite de tamaño, logging, X-Process-Time y headers de seguridad
+
+    Un solo nivel ASGI en lugar de tres middlewares encadenados: cada capa
+    extra añade una corrutina y un send_wrapper por petición.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        # El nivel de logging ya está configurado cuando se construye el stack
+        self.log_enabled = logger.isEnabledFor(logging.INFO)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        # 1. Rechazar peticiones que exceden el tamaño máximo (Content-Length)
+        for key, value in scope["headers"]:
+            if key == b"content-length":
+                if value.isdigit() and int(value) > _MAX_BODY:
+                    # Copias superficiales: servidores/middlewares pueden mutar el mensaje
+                    await send(dict(_OVERSIZE_START))
+                    await send(dict(_OVERSIZE_BODY_MESSAGE))
+                    return
+                break
+
+        start = time.perf_counter_ns()
+        status_code = 500
+
+        # 2. Headers de seguridad + tiempo de proceso en el inicio de la respuesta
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                process_time = (time.perf_counter_ns() - start) / 1e9
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    *_SEC_HEADERS_RAW,
+                    (b"x-process-time", f"{process_time:.6f}".encode()),
+                ]
+            await send(message)
+
+        # 3. Registrar la petición una sola vez, incluso si la ruta falla
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if self.log_enabled:
+                client = scope.get("client")
+                logger.info(
+                    "%s %s - Status: %d - Time: %.3fms - IP: %s",
+                    scope["method"],
+                    scope["path"],
+                    status_code,
+                    (time.perf_counter_ns() - start) / 1e6,
+                    client[0] if client else "unknown",
+                )
+
+
+class ProfilerMiddleware:
+    """Perfilado bajo demanda con pyinstrument (?profile=1 + X-Profile-Token)
+
+    Solo se registra si settings.profiling_enabled; sin el parámetro y el
+    token correcto la petición pasa directo sin costo extra.
+    Requiere `pip install pyinstrument` (no es dependencia de producción).
+    """
+
+    def __init__(self, app):
+        from pyinstrument import Profiler
+
+        self.app = app
+        self.profiler_class = Profiler
+        self.token = settings.profiling_token.encode()
+
+    def _wants_profile(self, scope) -> bool:
+        if not self.token or b"profile=" not in scope["query_string"]:
+            return False
+        query = parse_qs(scope["query_string"].decode("latin-1"))
+        if query.get("profile", [""])[0] not in ("1", "true"):
+            return False
+        for key, value in scope["headers"]:
+            if key == b"x-profile-token":
+                return hmac.compare_digest(value, self.token)
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wants_profile(scope):
+            return await self.app(scope, receive, send)
+
+        # Ejecutar la ruta descartando su respuesta; se devuelve el reporte HTML
+        async def discard(message):
+            pass
+
+        profiler = self.profiler_class(interval=0.001, async_mode="enabled")
+        profiler.start()
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            profiler.stop()
+
+        body = profiler.output_html().encode()
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/html; charset=utf-8"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
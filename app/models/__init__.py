@@ -10,12 +10,14 @@ from app.models.user import (
     UserInDB,
     UserResponse,
     Token,
+    RefreshTokenRequest,
     TokenData
 )
 
 from app.models.student import (
     StudentProfile,
     StudentInDB,
+    StudentEmbedding,
     StudentUpdate,
     StudentPublicProfile,
     Idioma,
@@ -28,6 +30,7 @@ from app.models.company import (
     CompanyProfile,
     CompanyInDB,
     CompanyUpdate,
+    CompanyResponse,
     CompanyPublicProfile
 )
 
@@ -46,7 +49,9 @@ from app.models.match import (
     MatchResponse,
     MatchListResponse,
     MatchDesglose,
-    RadarChartData
+    RadarChartData,
+    StudentSnapshot,
+    IdiomaSnapshot
 )
 
 from app.models.contact_request import (
@@ -72,18 +77,21 @@ __all__ = [
     # Bsase
     "PyObjectId",
     # User
-    "UserBase", "UserCreate", "UserLogin", "UserInDB", "UserResponse", "Token", "TokenData",
+    "UserBase", "UserCreate", "UserLogin", "UserInDB", "UserResponse", "Token",
+    "RefreshTokenRequest", "TokenData",
     # Student
-    "StudentProfile", "StudentInDB", "StudentUpdate", "StudentPublicProfile",
+    "StudentProfile", "StudentInDB", "StudentEmbedding", "StudentUpdate",
+    "StudentPublicProfile",
     "Idioma", "Experiencia", "Proyecto", "Certificacion",
     # Company
-    "CompanyProfile", "CompanyInDB", "CompanyUpdate", "CompanyPublicProfile",
+    "CompanyProfile", "CompanyInDB", "CompanyUpdate", "CompanyResponse",
+    "CompanyPublicProfile",
     # Vacancy
     "VacancyCreate", "VacancyInDB", "VacancyUpdate", "VacancyPublic",
     "IdiomaRequerido", "Requisito",
     # Match
     "MatchCreate", "MatchInDB", "MatchResponse", "MatchListResponse",
-    "MatchDesglose", "RadarChartData",
+    "MatchDesglose", "RadarChartData", "StudentSnapshot", "IdiomaSnapshot",
     # Contact Request
     "ContactRequestCreate", "ContactRequestInDB", "ContactRequestUpdate",
     "ContactRequestResponse", "StudentContactInfo", "ContactRequestList",
@@ -2,42 +2,51 @@
 Tipos base para todos los modelos
 """
 from bson import ObjectId
-from pydantic import GetJsonSchemaHandler
-from pydantic.json_schema import JsonSchemaValue
-from pydantic_core import core_schema
-from typing import Any
-
-
-class PyObjectId(ObjectId):
-    @classmethod
-    def __get_pydantic_core_schema__(
-        cls,
-        _source_type: Any,
-        _handler: Any,
-    ) -> core_schema.CoreSchema:
-        return core_schema.union_schema(
-            [
-                core_schema.is_instance_schema(ObjectId),
-                core_schema.chain_schema(
-                    [
-                        core_schema.str_schema(),
-                        core_schema.no_info_plain_validator_function(cls.validate),
-                    ]
-                ),
-            ],
-            serialization=core_schema.plain_serializer_function_ser_schema(
-                lambda x: str(x)
-            ),
-        )
-
-    @classmethod
-    def validate(cls, v):
-        if not ObjectId.is_valid(v):
-            raise ValueError("Invalid ObjectId")
+from datetime import datetime, timezone
+from pydantic import AfterValidator, PlainSerializer, PlainValidator, StringConstraints, WithJsonSchema
+from typing import Annotated, Any, Literal
+
+
+def _validate_object_id(v: Any) -> ObjectId:
+    if isinstance(v, ObjectId):
+        return v
+    if isinstance(v, str) and ObjectId.is_valid(v):
         return ObjectId(v)
+    raise ValueError("Invalid ObjectId")
+
+
+def utc_now() -> datetime:
+    """Fecha/hora actual en UTC con zona horaria (reemplaza datetime.utcnow)"""
+    return datetime.now(timezone.utc)
+
+
+# ObjectId de MongoDB: acepta ObjectId o str válido, serializa a str.
+# Tipo Annotated (no subclase) para que pydantic-core resuelva validador y
+# serializador directamente, sin despacho por clase.
+PyObjectId = Annotated[
+    ObjectId,
+    PlainValidator(_validate_object_id),
+    PlainSerializer(str, return_type=str),
+    WithJsonSchema({"type": "string"}),
+]
+
+
+def _normalize_email(v: str) -> str:
+    """Dominio en minúsculas (como EmailStr) para que el índice único no admita
+    "a@X.com" y "a@x.com" a la vez"""
+    local, _, domain = v.rpartition("@")
+    return f"{local}@{domain.lower()}"
+
+
+# Email validado con una regex que pydantic-core compila una sola vez (en lugar
+# de EmailStr/email-validator, que normaliza y revisa IDNA en cada instancia).
+# Solo para modelos de entrada: los *InDB leen como str lo ya guardado, que
+# EmailStr pudo aceptar aunque no cumpla esta regex (unicode, IDN)
+EmailAddress = Annotated[
+    str,
+    StringConstraints(pattern=r"^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$"),
+    AfterValidator(_normalize_email),
+]
 
-    @classmethod
-    def __get_pydantic_json_schema__(
-        cls, _core_schema: core_schema.CoreSchema, handler: GetJsonSchemaHandler
-    ) -> JsonSchemaValue:
-        return {"type": "string"}
\ No newline at end of file
+# Valores cerrados compartidos entre modelos
+Modalidad = Literal["Presencial", "Remoto", "Híbrido"]
@@ -2,11 +2,10 @@
 Modelo de Empresa
 Define el perfil de una empresa
 """
-from pydantic import BaseModel, EmailStr, Field, HttpUrl
+from pydantic import BaseModel, ConfigDict, Field, HttpUrl
 from typing import List, Optional
 from datetime import datetime
-from bson import ObjectId
-from app.models.base import PyObjectId
+from app.models.base import EmailAddress, PyObjectId, utc_now
 
 
 class CompanyProfile(BaseModel):
@@ -21,7 +20,7 @@ class CompanyProfile(BaseModel):
     )
     
     # Información de contacto
-    email_contacto: EmailStr
+    email_contacto: EmailAddress
     telefono: str
     sitio_web: Optional[HttpUrl] = None
     
@@ -45,8 +44,8 @@ class CompanyProfile(BaseModel):
     # Logo (URL o path)
     logo_url: Optional[str] = None
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "nombre_empresa": "Tech Solutions SA de CV",
                 "rfc": "TSO123456ABC",
@@ -63,7 +62,8 @@ class CompanyProfile(BaseModel):
                 "beneficios": ["Seguro médico", "Home office", "Bonos"],
                 "linkedin": "https://linkedin.com/company/techsolutions"
             }
-        }
+        },
+    )
 
 
 # Alias para compatibilidad con routers
@@ -72,10 +72,11 @@ CompanyCreate = CompanyProfile
 
 class CompanyInDB(CompanyProfile):
     """Modelo de empresa en base de datos"""
-    id: Optional[PyObjectId] = Field(default_factory=PyObjectId, alias="_id")
+    id: Optional[PyObjectId] = Field(default=None, alias="_id")  # Mongo asigna _id al insertar
     user_id: PyObjectId  # Referencia al User
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    email_contacto: str  # Ya validado al guardar (ver EmailAddress)
+    created_at: datetime = Field(default_factory=utc_now)
+    updated_at: datetime = Field(default_factory=utc_now)
     
     # Estado
     verificada: bool = False  # Admin verifica que es empresa legítima
@@ -86,10 +87,9 @@ class CompanyInDB(CompanyProfile):
     num_vacantes_publicadas: int = 0
     num_candidatos_contactados: int = 0
     
-    class Config:
-        populate_by_name = True
-        arbitrary_types_allowed = True
-        json_encoders = {ObjectId: str}
+    model_config = ConfigDict(
+        populate_by_name=True,
+    )
 
 
 class CompanyUpdate(BaseModel):
@@ -97,7 +97,7 @@ class CompanyUpdate(BaseModel):
     nombre_empresa: Optional[str] = None
     giro: Optional[str] = None
     tamano: Optional[str] = None
-    email_contacto: Optional[EmailStr] = None
+    email_contacto: Optional[EmailAddress] = None
     telefono: Optional[str] = None
     sitio_web: Optional[HttpUrl] = None
     direccion: Optional[str] = None
@@ -119,24 +119,27 @@ class CompanyResponse(BaseModel):
     rfc: str
     giro: str
     tamano: str
-    email_contacto: EmailStr
+    # Solo salida: email/URLs ya se validaron al guardar, aquí son str planos
+    email_contacto: str
     telefono: str
     ciudad: str
     estado: str
     codigo_postal: str
     direccion: str
     descripcion: str
-    sitio_web: Optional[HttpUrl] = None
+    sitio_web: Optional[str] = None
     logo_url: Optional[str] = None
     beneficios: List[str]
     verificada: bool
     fecha_verificacion: Optional[datetime] = None
     created_at: datetime
+    updated_at: Optional[datetime] = None
     num_vacantes_publicadas: int = 0
     
-    class Config:
-        populate_by_name = True
-        json_schema_extra = {
+    model_config = ConfigDict(
+        frozen=True,
+        populate_by_name=True,
+        json_schema_extra={
             "example": {
                 "_id": "507f1f77bcf86cd799439011",
                 "nombre_empresa": "Tech Solutions SA",
@@ -158,7 +161,8 @@ class CompanyResponse(BaseModel):
                 "created_at": "2025-10-01T08:00:00",
                 "num_vacantes_publicadas": 5
             }
-        }
+        },
+    )
 
 
 class CompanyPublicProfile(BaseModel):
@@ -169,14 +173,15 @@ class CompanyPublicProfile(BaseModel):
     ciudad: str
     estado: str
     descripcion: str
-    sitio_web: Optional[HttpUrl]
+    sitio_web: Optional[str]
     beneficios: List[str]
     logo_url: Optional[str]
     verificada: bool
     num_vacantes_activas: int
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        frozen=True,
+        json_schema_extra={
             "example": {
                 "nombre_empresa": "Tech Solutions SA",
                 "giro": "Tecnología",
@@ -189,4 +194,5 @@ class CompanyPublicProfile(BaseModel):
                 "verificada": True,
                 "num_vacantes_activas": 5
             }
-        }
\ No newline at end of file
+        },
+    )
\ No newline at end of file
@@ -2,11 +2,10 @@
 Modelo de ContactRequest
 Solicitud de contacto de empresa a estudiante
 """
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Optional
 from datetime import datetime
-from bson import ObjectId
-from app.models.base import PyObjectId  # ← IMPORTAR en lugar de definir
+from app.models.base import PyObjectId, utc_now  # ← IMPORTAR en lugar de definir
 
 
 class ContactRequestCreate(BaseModel):
@@ -19,19 +18,20 @@ class ContactRequestCreate(BaseModel):
         description="Motivo de la solicitud (opcional)"
     )
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "vacancy_id": "507f1f77bcf86cd799439011",
                 "student_matricula": "A01234567",
                 "motivo": "El perfil del candidato es ideal para nuestro equipo"
             }
-        }
+        },
+    )
 
 
 class ContactRequestInDB(ContactRequestCreate):
     """Modelo de solicitud en base de datos"""
-    id: Optional[PyObjectId] = Field(default_factory=PyObjectId, alias="_id")
+    id: Optional[PyObjectId] = Field(default=None, alias="_id")  # Mongo asigna _id al insertar
     vacancy_id: PyObjectId
     company_id: PyObjectId  # Empresa que solicita
     student_matricula: str
@@ -43,7 +43,7 @@ class ContactRequestInDB(ContactRequestCreate):
     )
     
     # Fechas
-    fecha_solicitud: datetime = Field(default_factory=datetime.utcnow)
+    fecha_solicitud: datetime = Field(default_factory=utc_now)
     fecha_respuesta: Optional[datetime] = None
     
     # Respuesta del admin
@@ -53,10 +53,9 @@ class ContactRequestInDB(ContactRequestCreate):
     # Motivo del rechazo (si aplica)
     motivo_rechazo: Optional[str] = None
     
-    class Config:
-        populate_by_name = True
-        arbitrary_types_allowed = True
-        json_encoders = {ObjectId: str, datetime: lambda v: v.isoformat()}
+    model_config = ConfigDict(
+        populate_by_name=True,
+    )
 
 
 class ContactRequestUpdate(BaseModel):
@@ -65,13 +64,14 @@ class ContactRequestUpdate(BaseModel):
     comentario_admin: Optional[str] = None
     motivo_rechazo: Optional[str] = None
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "estado": "aprobada",
                 "comentario_admin": "Empresa verificada, candidato notificado"
             }
-        }
+        },
+    )
 
 
 class ContactRequestResponse(BaseModel):
@@ -86,9 +86,10 @@ class ContactRequestResponse(BaseModel):
     motivo: Optional[str]
     comentario_admin: Optional[str]
     
-    class Config:
-        populate_by_name = True
-        json_schema_extra = {
+    model_config = ConfigDict(
+        frozen=True,
+        populate_by_name=True,
+        json_schema_extra={
             "example": {
                 "_id": "507f1f77bcf86cd799439011",
                 "vacancy_titulo": "Desarrollador Full Stack Junior",
@@ -100,7 +101,8 @@ class ContactRequestResponse(BaseModel):
                 "motivo": "Perfil ideal para el equipo",
                 "comentario_admin": None
             }
-        }
+        },
+    )
 
 
 class StudentContactInfo(BaseModel):
@@ -118,8 +120,9 @@ class StudentContactInfo(BaseModel):
     github: Optional[str] = None
     portafolio: Optional[str] = None
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        frozen=True,
+        json_schema_extra={
             "example": {
                 "matricula": "A01234567",
                 "nombre_completo": "Juan Pérez García",
@@ -129,7 +132,8 @@ class StudentContactInfo(BaseModel):
                 "semestre": 8,
                 "cv_url": "/uploads/cvs/A01234567.pdf"
             }
-        }
+        },
+    )
 
 
 class ContactRequestList(BaseModel):
@@ -138,10 +142,11 @@ class ContactRequestList(BaseModel):
     pendientes: int
     aprobadas: int
     rechazadas: int
-    solicitudes: list
+    solicitudes: List[ContactRequestResponse] = Field(default_factory=list)
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        frozen=True,
+        json_schema_extra={
             "example": {
                 "total": 25,
                 "pendientes": 10,
@@ -149,4 +154,5 @@ class ContactRequestList(BaseModel):
                 "rechazadas": 3,
                 "solicitudes": []
             }
-        }
\ No newline at end of file
+        },
+    )
\ No newline at end of file
@@ -2,11 +2,58 @@
 Modelo de Match
 Resultado del matching entre estudiante y vacante
 """
-from pydantic import BaseModel, Field
-from typing import Dict, List, Optional
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field, field_validator
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
+import struct
 from bson import ObjectId
-from app.models.base import PyObjectId  # ← IMPORTAR en lugar de definir
+from app.models.base import PyObjectId, utc_now  # ← IMPORTAR en lugar de definir
+
+
+# Ejemplos para el esquema OpenAPI, definidos una vez y compartidos entre modelos
+_RADAR_CATEGORIES = (
+    "Habilidades Técnicas",
+    "Habilidades Blandas",
+    "Idiomas",
+    "Experiencia",
+    "Carrera",
+    "Semestre",
+    "Modalidad",
+)
+
+_DESGLOSE_EXAMPLE = {
+    "habilidades_tecnicas": 0.95,
+    "habilidades_blandas": 0.85,
+    "idiomas": 0.90,
+    "experiencia": 0.75,
+    "carrera": 1.0,
+    "semestre": 1.0,
+    "modalidad": 1.0
+}
+
+_MATCH_RESPONSE_EXAMPLE = {
+    "_id": "507f1f77bcf86cd799439011",
+    "student_matricula": "A01234567",
+    "porcentaje_match": 87.5,
+    "desglose": _DESGLOSE_EXAMPLE,
+    "fecha_match": "2025-10-16T10:30:00",
+    "carrera": "Ingeniería en Sistemas",
+    "semestre": 8,
+    "habilidades_tecnicas": ["Python", "React", "FastAPI"],
+    "habilidades_blandas": ["Trabajo en equipo", "Comunicación"],
+    "idiomas": [{"idioma": "Inglés", "nivel": "B2", "porcentaje": "80%"}],
+    "tiene_experiencia": True,
+    "modalidad_preferida": "Híbrido",
+    "radar_chart_data": {
+        "Habilidades Técnicas": 95,
+        "Habilidades Blandas": 85,
+        "Idiomas": 90,
+        "Experiencia": 75,
+        "Carrera": 100,
+        "Semestre": 100,
+        "Modalidad": 100
+    }
+}
 
 
 class MatchDesglose(BaseModel):
@@ -54,18 +101,49 @@ class MatchDesglose(BaseModel):
         description="Score de modalidad de trabajo (0-1)"
     )
     
-    class Config:
-        json_schema_extra = {
-            "example": {
-                "habilidades_tecnicas": 0.95,
-                "habilidades_blandas": 0.85,
-                "idiomas": 0.90,
-                "experiencia": 0.75,
-                "carrera": 1.0,
-                "semestre": 1.0,
-                "modalidad": 1.0
-            }
-        }
+    model_config = ConfigDict(
+        json_schema_extra={"example": _DESGLOSE_EXAMPLE},
+    )
+
+
+# Orden fijo de las dimensiones del desglose (el mismo que _RADAR_CATEGORIES)
+DESGLOSE_FIELDS = tuple(MatchDesglose.model_fields)
+_DESGLOSE_STRUCT = struct.Struct("<7f")
+
+
+def pack_desglose(desglose: MatchDesglose) -> bytes:
+    """Empaquetar el desglose como 7 float32 (28 bytes) para guardarlo en MongoDB"""
+    return _DESGLOSE_STRUCT.pack(*(getattr(desglose, f) for f in DESGLOSE_FIELDS))
+
+
+def unpack_desglose(data: bytes) -> Dict[str, float]:
+    """Desempaquetar el desglose a un dict con nombres
+
+    Se redondea a 6 decimales para quitar el ruido de float32
+    (0.95 se guarda como 0.949999988...).
+    """
+    return {
+        field: round(value, 6)
+        for field, value in zip(DESGLOSE_FIELDS, _DESGLOSE_STRUCT.unpack(data))
+    }
+
+
+class IdiomaSnapshot(BaseModel):
+    """Idioma del estudiante en el snapshot del match (porcentaje opcional en registros antiguos)"""
+    idioma: str
+    nivel: str
+    porcentaje: Optional[str] = None
+
+
+class StudentSnapshot(BaseModel):
+    """Datos anónimos del estudiante copiados al match (evita leer students)"""
+    carrera: str = ""
+    semestre: int = 0
+    habilidades_tecnicas: List[str] = Field(default_factory=list)
+    habilidades_blandas: List[str] = Field(default_factory=list)
+    idiomas: List[IdiomaSnapshot] = Field(default_factory=list)
+    tiene_experiencia: bool = False
+    modalidad_preferida: str = ""
 
 
 class MatchCreate(BaseModel):
@@ -78,19 +156,21 @@ class MatchCreate(BaseModel):
 
 class MatchInDB(MatchCreate):
     """Modelo de match en base de datos"""
-    id: Optional[PyObjectId] = Field(default_factory=PyObjectId, alias="_id")
+    id: Optional[PyObjectId] = Field(default_factory=ObjectId, alias="_id")
     vacancy_id: PyObjectId
     student_matricula: str  # Solo matrícula, NO ObjectId para privacidad
     
-    # Matching
+    # Matching (en MongoDB el desglose se guarda empaquetado en desglose_packed)
     porcentaje_match: float = Field(..., ge=0, le=100)
-    desglose: MatchDesglose
+    desglose: MatchDesglose = Field(
+        validation_alias=AliasChoices("desglose_packed", "desglose")
+    )
     
     # Similitud de embeddings (IA)
     embedding_similarity: Optional[float] = None
     
     # Fechas
-    fecha_match: datetime = Field(default_factory=datetime.utcnow)
+    fecha_match: datetime = Field(default_factory=utc_now)
     
     # Estado
     visto_por_empresa: bool = False
@@ -99,10 +179,19 @@ class MatchInDB(MatchCreate):
     # Para gráfica de araña
     radar_chart_data: Optional[Dict[str, float]] = None
     
-    class Config:
-        populate_by_name = True
-        arbitrary_types_allowed = True
-        json_encoders = {ObjectId: str, datetime: lambda v: v.isoformat()}
+    # Snapshot del estudiante para construir MatchResponse sin otra consulta
+    student_snapshot: Optional[StudentSnapshot] = None
+    
+    model_config = ConfigDict(
+        populate_by_name=True,
+    )
+    
+    @field_validator("desglose", mode="before")
+    @classmethod
+    def unpack_desglose_bytes(cls, v):
+        if isinstance(v, bytes):
+            return unpack_desglose(v)
+        return v
 
 
 class MatchResponse(BaseModel):
@@ -118,48 +207,18 @@ class MatchResponse(BaseModel):
     semestre: int
     habilidades_tecnicas: List[str]
     habilidades_blandas: List[str]
-    idiomas: List[Dict[str, str]]
+    idiomas: List[IdiomaSnapshot]
     tiene_experiencia: bool
     modalidad_preferida: str
     
     # Gráfica de araña (para visualización)
     radar_chart_data: Dict[str, float]
     
-    class Config:
-        populate_by_name = True
-        json_schema_extra = {
-            "example": {
-                "_id": "507f1f77bcf86cd799439011",
-                "student_matricula": "A01234567",
-                "porcentaje_match": 87.5,
-                "desglose": {
-                    "habilidades_tecnicas": 0.95,
-                    "habilidades_blandas": 0.85,
-                    "idiomas": 0.90,
-                    "experiencia": 0.75,
-                    "carrera": 1.0,
-                    "semestre": 1.0,
-                    "modalidad": 1.0
-                },
-                "fecha_match": "2025-10-16T10:30:00",
-                "carrera": "Ingeniería en Sistemas",
-                "semestre": 8,
-                "habilidades_tecnicas": ["Python", "React", "FastAPI"],
-                "habilidades_blandas": ["Trabajo en equipo", "Comunicación"],
-                "idiomas": [{"idioma": "Inglés", "nivel": "B2"}],
-                "tiene_experiencia": True,
-                "modalidad_preferida": "Híbrido",
-                "radar_chart_data": {
-                    "Habilidades Técnicas": 95,
-                    "Habilidades Blandas": 85,
-                    "Idiomas": 90,
-                    "Experiencia": 75,
-                    "Carrera": 100,
-                    "Semestre": 100,
-                    "Modalidad": 100
-                }
-            }
-        }
+    model_config = ConfigDict(
+        frozen=True,
+        populate_by_name=True,
+        json_schema_extra={"example": _MATCH_RESPONSE_EXAMPLE},
+    )
 
 
 class MatchListResponse(BaseModel):
@@ -167,46 +226,34 @@ class MatchListResponse(BaseModel):
     vacancy_id: str
     vacancy_titulo: str
     total_matches: int
-    matches: List[MatchResponse]
+    matches: Tuple[MatchResponse, ...]
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        frozen=True,
+        json_schema_extra={
             "example": {
                 "vacancy_id": "507f1f77bcf86cd799439011",
                 "vacancy_titulo": "Desarrollador Full Stack Junior",
                 "total_matches": 15,
                 "matches": []
             }
-        }
+        },
+    )
 
 
 class RadarChartData(BaseModel):
     """Datos para gráfica de araña (Spider/Radar Chart)"""
-    categories: List[str] = [
-        "Habilidades Técnicas",
-        "Habilidades Blandas",
-        "Idiomas",
-        "Experiencia",
-        "Carrera",
-        "Semestre",
-        "Modalidad"
-    ]
+    categories: List[str] = list(_RADAR_CATEGORIES)
     valores_requeridos: List[float]  # Lo que pide la vacante (100%)
     valores_candidato: List[float]   # Lo que tiene el candidato
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        frozen=True,
+        json_schema_extra={
             "example": {
-                "categories": [
-                    "Habilidades Técnicas",
-                    "Habilidades Blandas",
-                    "Idiomas",
-                    "Experiencia",
-                    "Carrera",
-                    "Semestre",
-                    "Modalidad"
-                ],
+                "categories": list(_RADAR_CATEGORIES),
                 "valores_requeridos": [100, 100, 100, 100, 100, 100, 100],
                 "valores_candidato": [95, 85, 90, 75, 100, 100, 100]
             }
-        }
\ No newline at end of file
+        },
+    )
\ No newline at end of file
@@ -2,41 +2,45 @@
 Modelo de Message
 Mensajes entre estudiantes y administradores
 """
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field, StringConstraints
+from typing import Annotated, Dict, List, Literal, Optional
 from datetime import datetime
 from bson import ObjectId
-from app.models.base import PyObjectId  # ← IMPORTAR en lugar de definir
+from app.models.base import PyObjectId, utc_now  # ← IMPORTAR en lugar de definir
+
+PrioridadMensaje = Literal["baja", "normal", "alta", "urgente"]
+EstadoMensaje = Literal["abierto", "en_proceso", "resuelto", "cerrado"]
 
 
 class MessageCreate(BaseModel):
     """Modelo para crear un mensaje"""
-    asunto: str = Field(..., max_length=200)
-    mensaje: str = Field(..., max_length=2000)
+    asunto: Annotated[str, StringConstraints(max_length=200)]
+    mensaje: Annotated[str, StringConstraints(max_length=2000)]
     categoria: str = Field(
         default="general",
         description="general, perfil, cv, vacante, otro"
     )
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "asunto": "Ayuda con mi perfil",
                 "mensaje": "Necesito ayuda para completar mi perfil profesional. ¿Qué información es más importante?",
                 "categoria": "perfil"
             }
-        }
+        },
+    )
 
 
 class MessageInDB(MessageCreate):
     """Modelo de mensaje en base de datos"""
-    id: Optional[PyObjectId] = Field(default_factory=PyObjectId, alias="_id")
+    id: Optional[PyObjectId] = Field(default_factory=ObjectId, alias="_id")
     student_id: PyObjectId  # Estudiante que envía
     student_matricula: str  # Para búsquedas rápidas
     
     # Estado
     leido: bool = False
-    fecha_envio: datetime = Field(default_factory=datetime.utcnow)
+    fecha_envio: datetime = Field(default_factory=utc_now)
     fecha_leido: Optional[datetime] = None
     
     # Respuesta
@@ -46,6 +50,7 @@ class MessageInDB(MessageCreate):
     respuesta: Optional[str] = None
     
     # Prioridad (establecida por admin)
+    # str: los Literal validan solo lo que envía el admin (MessageAdminResponse)
     prioridad: str = Field(
         default="normal",
         description="baja, normal, alta, urgente"
@@ -57,10 +62,9 @@ class MessageInDB(MessageCreate):
         description="abierto, en_proceso, resuelto, cerrado"
     )
     
-    class Config:
-        populate_by_name = True
-        arbitrary_types_allowed = True
-        json_encoders = {ObjectId: str, datetime: lambda v: v.isoformat()}
+    model_config = ConfigDict(
+        populate_by_name=True,
+    )
 
 
 class MessageResponse(BaseModel):
@@ -77,9 +81,10 @@ class MessageResponse(BaseModel):
     estado: str
     prioridad: str
     
-    class Config:
-        populate_by_name = True
-        json_schema_extra = {
+    model_config = ConfigDict(
+        frozen=True,
+        populate_by_name=True,
+        json_schema_extra={
             "example": {
                 "_id": "507f1f77bcf86cd799439011",
                 "asunto": "Ayuda con mi perfil",
@@ -93,23 +98,25 @@ class MessageResponse(BaseModel):
                 "estado": "resuelto",
                 "prioridad": "normal"
             }
-        }
+        },
+    )
 
 
 class MessageAdminResponse(BaseModel):
     """Modelo para que admin responda mensaje"""
     respuesta: str = Field(..., max_length=2000)
-    estado: Optional[str] = Field(None, description="en_proceso, resuelto, cerrado")
-    prioridad: Optional[str] = Field(None, description="baja, normal, alta, urgente")
+    estado: Optional[EstadoMensaje] = Field(None, description="en_proceso, resuelto, cerrado")
+    prioridad: Optional[PrioridadMensaje] = Field(None, description="baja, normal, alta, urgente")
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "respuesta": "Hola, gracias por tu mensaje. Para mejorar tu perfil...",
                 "estado": "resuelto",
                 "prioridad": "normal"
             }
-        }
+        },
+    )
 
 
 class MessageUpdate(BaseModel):
@@ -124,17 +131,18 @@ class MessageList(BaseModel):
     total: int
     sin_leer: int
     sin_responder: int
-    mensajes: list
+    mensajes: List[MessageResponse] = Field(default_factory=list)
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "total": 45,
                 "sin_leer": 12,
                 "sin_responder": 8,
                 "mensajes": []
             }
-        }
+        },
+    )
 
 
 class MessageStats(BaseModel):
@@ -146,10 +154,10 @@ class MessageStats(BaseModel):
     mensajes_resueltos: int
     mensajes_urgentes: int
     tiempo_promedio_respuesta_horas: Optional[float] = None
-    categorias_mas_comunes: dict
+    categorias_mas_comunes: Dict[str, int]
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "total_mensajes": 150,
                 "mensajes_sin_leer": 15,
@@ -165,4 +173,5 @@ class MessageStats(BaseModel):
                     "general": 50
                 }
             }
-        }
\ No newline at end of file
+        },
+    )
\ No newline at end of file
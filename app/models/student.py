@@ -2,11 +2,11 @@
 Modelo de Estudiante
 Define el perfil completo de un estudiante
 """
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional
 from datetime import datetime
 from bson import ObjectId
-from app.models.base import PyObjectId
+from app.models.base import Modalidad, PyObjectId, utc_now
 
 
 #class PyObjectId(ObjectId):
@@ -30,14 +30,15 @@ class Idioma(BaseModel):
     idioma: str = Field(..., description="Nombre del idioma")
     nivel: str = Field(..., description="Basico, Intermedio, Avanzado, Nativo")
     porcentaje: str = Field(..., description="Indica el porcentaje")
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "idioma": "Inglés",
                 "nivel": "Basico",
                 "porcentaje": "30%"
             }
-        }
+        },
+    )
 
 
 class Experiencia(BaseModel):
@@ -49,8 +50,8 @@ class Experiencia(BaseModel):
     fecha_fin: Optional[str] = None  # None si es trabajo actual
     es_actual: bool = False
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "empresa": "Tech Company SA",
                 "puesto": "Desarrollador Junior",
@@ -59,7 +60,8 @@ class Experiencia(BaseModel):
                 "fecha_fin": "2024-12",
                 "es_actual": False
             }
-        }
+        },
+    )
 
 
 class Proyecto(BaseModel):
@@ -70,15 +72,16 @@ class Proyecto(BaseModel):
     url: Optional[str] = None
     fecha: Optional[str] = None
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "nombre": "Sistema de Inventario",
                 "descripcion": "Aplicación web para gestión de inventarios",
                 "tecnologias": ["Python", "FastAPI", "React"],
                 "url": "https://github.com/user/proyecto"
             }
-        }
+        },
+    )
 
 
 class Certificacion(BaseModel):
@@ -88,14 +91,15 @@ class Certificacion(BaseModel):
     fecha_obtencion: Optional[str] = None
     url_credencial: Optional[str] = None
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "nombre": "Python for Data Science",
                 "institucion": "Coursera",
                 "fecha_obtencion": "2024-08"
             }
-        }
+        },
+    )
 
 
 class StudentProfile(BaseModel):
@@ -131,7 +135,7 @@ class StudentProfile(BaseModel):
     
     # Preferencias
     areas_interes: List[str] = Field(default_factory=list)
-    modalidad_preferida: str = Field(
+    modalidad_preferida: Modalidad = Field(
         default="Híbrido",
         description="Presencial, Remoto, Híbrido"
     )
@@ -144,8 +148,8 @@ class StudentProfile(BaseModel):
         description="Breve descripción profesional"
     )
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "matricula": "A01234567",
                 "nombre_completo": "Juan Pérez García",
@@ -165,27 +169,46 @@ class StudentProfile(BaseModel):
                 "modalidad_preferida": "Híbrido",
                 "descripcion_breve": "Estudiante apasionado por el desarrollo de software"
             }
-        }
+        },
+    )
 
 
 class StudentInDB(StudentProfile):
     """Modelo de estudiante en base de datos"""
-    id: Optional[PyObjectId] = Field(default_factory=PyObjectId, alias="_id")
+    id: Optional[PyObjectId] = Field(default_factory=ObjectId, alias="_id")
     user_id: PyObjectId  # Referencia al User
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
-    
-    # Embeddings para matching (generados por IA)
-    profile_embedding: Optional[List[float]] = None
+    # str y no Modalidad: los documentos ya guardados pueden tener otros valores
+    # ("hibrido", minúsculas) y validar aquí rompería get_current_student
+    modalidad_preferida: str = "Híbrido"
+    created_at: datetime = Field(default_factory=utc_now)
+    updated_at: datetime = Field(default_factory=utc_now)
     
     # Estado
     perfil_completo: bool = False
     visible_empresas: bool = True
     
-    class Config:
-        populate_by_name = True
-        arbitrary_types_allowed = True
-        json_encoders = {ObjectId: str}
+    model_config = ConfigDict(
+        populate_by_name=True,
+    )
+
+
+class StudentEmbedding(BaseModel):
+    """
+    Embedding del perfil (colección student_embeddings, _id = _id del estudiante)
+    
+    Separado de students para que editar el perfil no reescriba el vector
+    y para poder regenerarlo cuando cambie el modelo de IA
+    """
+    student_id: PyObjectId = Field(alias="_id")
+    # float32 little-endian empaquetado (ver pack_embedding en services/scoring):
+    # la mitad de tamaño que una lista de doubles y sin validar cada elemento
+    embedding: bytes
+    model_version: str
+    updated_at: datetime = Field(default_factory=utc_now)
+    
+    model_config = ConfigDict(
+        populate_by_name=True,
+    )
 
 
 class StudentUpdate(BaseModel):
@@ -203,7 +226,7 @@ class StudentUpdate(BaseModel):
     proyectos: Optional[List[Proyecto]] = None
     certificaciones: Optional[List[Certificacion]] = None
     areas_interes: Optional[List[str]] = None
-    modalidad_preferida: Optional[str] = None
+    modalidad_preferida: Optional[Modalidad] = None
     salario_esperado: Optional[float] = None
     descripcion_breve: Optional[str] = None
     visible_empresas: Optional[bool] = None
@@ -224,8 +247,9 @@ class StudentPublicProfile(BaseModel):
     num_proyectos: int
     num_certificaciones: int
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        frozen=True,
+        json_schema_extra={
             "example": {
                 "matricula": "A01234567",
                 "carrera": "Ingeniería en Sistemas",
@@ -239,4 +263,5 @@ class StudentPublicProfile(BaseModel):
                 "num_proyectos": 3,
                 "num_certificaciones": 2
             }
-        }
\ No newline at end of file
+        },
+    )
\ No newline at end of file
@@ -2,25 +2,27 @@
 Modelo de Usuario
 Define la estructura del usuario base para autenticación
 """
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field, StringConstraints
+from typing import Annotated, Literal, Optional
 from datetime import datetime
 from bson import ObjectId
-from app.models.base import PyObjectId  # ← IMPORTAR en lugar de definir
+from app.models.base import EmailAddress, PyObjectId, utc_now  # ← IMPORTAR en lugar de definir
 
 
 class UserBase(BaseModel):
     """Campos base del usuario"""
-    email: EmailStr
-    username: str = Field(..., min_length=3, max_length=50)
-    role: str = Field(..., description="estudiante, empresa, o admin")
+    email: str
+    username: Annotated[str, StringConstraints(min_length=3, max_length=50)]
+    role: str  # estudiante, empresa, admin (validado en UserCreate)
     is_active: bool = True
     email_verified: bool = False
 
 
 class UserCreate(UserBase):
     """Modelo para crear usuario (con contraseña)"""
-    password: str = Field(..., min_length=8, max_length=128)  # aumentamos a 128 chars para dar más flexibilidad
+    email: EmailAddress
+    role: Literal["estudiante", "empresa", "admin"]
+    password: Annotated[str, StringConstraints(min_length=8, max_length=128)]  # aumentamos a 128 chars para dar más flexibilidad
 
 
 class UserLogin(BaseModel):
@@ -31,25 +33,24 @@ class UserLogin(BaseModel):
 
 class UserInDB(UserBase):
     """Modelo de usuario en base de datos"""
-    id: Optional[PyObjectId] = Field(default_factory=PyObjectId, alias="_id")
+    id: Optional[PyObjectId] = Field(default_factory=ObjectId, alias="_id")
     hashed_password: str
     mfa_secret: Optional[str] = None  # Para autenticación de dos factores
     mfa_enabled: bool = False
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=utc_now)
     last_login: Optional[datetime] = None
     
-    class Config:
-        populate_by_name = True
-        arbitrary_types_allowed = True
-        json_encoders = {ObjectId: str}
-        json_schema_extra = {
+    model_config = ConfigDict(
+        populate_by_name=True,
+        json_schema_extra={
             "example": {
                 "email": "estudiante@universidad.edu.mx",
                 "username": "juan_perez",
                 "role": "estudiante",
                 "is_active": True
             }
-        }
+        },
+    )
 
 
 class UserResponse(UserBase):
@@ -58,9 +59,10 @@ class UserResponse(UserBase):
     created_at: datetime
     last_login: Optional[datetime] = None
     
-    class Config:
-        populate_by_name = True
-        json_schema_extra = {
+    model_config = ConfigDict(
+        frozen=True,
+        populate_by_name=True,
+        json_schema_extra={
             "example": {
                 "_id": "507f1f77bcf86cd799439011",
                 "email": "estudiante@universidad.edu.mx",
@@ -69,7 +71,8 @@ class UserResponse(UserBase):
                 "is_active": True,
                 "created_at": "2025-10-16T10:30:00"
             }
-        }
+        },
+    )
 
 
 class Token(BaseModel):
@@ -79,6 +82,11 @@ class Token(BaseModel):
     token_type: str = "bearer"
 
 
+class RefreshTokenRequest(BaseModel):
+    """Cuerpo JSON de /refresh y /logout"""
+    refresh_token: str
+
+
 class TokenData(BaseModel):
     """Datos dentro del token"""
     username: Optional[str] = None
@@ -2,11 +2,13 @@
 Modelo de Vacante
 Define las ofertas laborales de las empresas
 """
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Literal, Optional
 from datetime import datetime
 from bson import ObjectId
-from app.models.base import PyObjectId  # ← IMPORTAR en lugar de definir
+from app.models.base import Modalidad, PyObjectId, utc_now  # ← IMPORTAR en lugar de definir
+
+TipoContrato = Literal["Tiempo completo", "Medio tiempo", "Por proyecto", "Prácticas", "Becario"]
 
 
 class IdiomaRequerido(BaseModel):
@@ -14,13 +16,14 @@ class IdiomaRequerido(BaseModel):
     idioma: str
     nivel_minimo: str  # Basico, Intermedio, Avanzado
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "idioma": "Inglés",
                 "nivel_minimo": "Basico"
             }
-        }
+        },
+    )
 
 
 class Requisito(BaseModel):
@@ -28,13 +31,14 @@ class Requisito(BaseModel):
     descripcion: str
     es_indispensable: bool = True
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "descripcion": "Experiencia con APIs REST",
                 "es_indispensable": True
             }
-        }
+        },
+    )
 
 
 class VacancyCreate(BaseModel):
@@ -66,11 +70,11 @@ class VacancyCreate(BaseModel):
     otros_requisitos: List[Requisito] = Field(default_factory=list)
     
     # Oferta
-    tipo_contrato: str = Field(
+    tipo_contrato: TipoContrato = Field(
         ...,
         description="Tiempo completo, Medio tiempo, Por proyecto, Prácticas, Becario"
     )
-    modalidad: str = Field(
+    modalidad: Modalidad = Field(
         ...,
         description="Presencial, Remoto, Híbrido"
     )
@@ -101,8 +105,8 @@ class VacancyCreate(BaseModel):
     # Número de vacantes
     num_vacantes: int = Field(default=1, ge=1)
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "titulo": "Desarrollador Full Stack Junior",
                 "area": "Desarrollo de Software",
@@ -132,14 +136,19 @@ class VacancyCreate(BaseModel):
                 ],
                 "num_vacantes": 2
             }
-        }
+        },
+    )
 
 
 class VacancyInDB(VacancyCreate):
     """Modelo de vacante en base de datos"""
-    id: Optional[PyObjectId] = Field(default_factory=PyObjectId, alias="_id")
+    id: Optional[PyObjectId] = Field(default_factory=ObjectId, alias="_id")
     company_id: PyObjectId  # Referencia a la empresa
     
+    # Lo guardado se lee tal cual: los Literal solo validan la entrada
+    tipo_contrato: str
+    modalidad: str
+    
     # Estado
     estado: str = Field(
         default="activa",
@@ -147,11 +156,12 @@ class VacancyInDB(VacancyCreate):
     )
     
     # Fechas
-    fecha_publicacion: datetime = Field(default_factory=datetime.utcnow)
-    fecha_actualizacion: datetime = Field(default_factory=datetime.utcnow)
+    fecha_publicacion: datetime = Field(default_factory=utc_now)
+    fecha_actualizacion: datetime = Field(default_factory=utc_now)
     
     # Embeddings para matching (generados por IA)
-    vacancy_embedding: Optional[List[float]] = None
+    # float32 little-endian empaquetado (ver pack_embedding en services/scoring)
+    vacancy_embedding: Optional[bytes] = None
     
     # Estadísticas
     num_visualizaciones: int = 0
@@ -164,10 +174,9 @@ class VacancyInDB(VacancyCreate):
         description="Lista de matrículas"
     )
     
-    class Config:
-        populate_by_name = True
-        arbitrary_types_allowed = True
-        json_encoders = {ObjectId: str, datetime: lambda v: v.isoformat()}
+    model_config = ConfigDict(
+        populate_by_name=True,
+    )
 
 
 class VacancyUpdate(BaseModel):
@@ -178,8 +187,8 @@ class VacancyUpdate(BaseModel):
     habilidades_tecnicas_requeridas: Optional[List[str]] = None
     habilidades_tecnicas_deseables: Optional[List[str]] = None
     habilidades_blandas_requeridas: Optional[List[str]] = None
-    tipo_contrato: Optional[str] = None
-    modalidad: Optional[str] = None
+    tipo_contrato: Optional[TipoContrato] = None
+    modalidad: Optional[Modalidad] = None
     salario_minimo: Optional[float] = None
     salario_maximo: Optional[float] = None
     beneficios: Optional[List[str]] = None
@@ -205,9 +214,10 @@ class VacancyPublic(BaseModel):
     fecha_publicacion: datetime
     num_vacantes: int
     
-    class Config:
-        populate_by_name = True
-        json_schema_extra = {
+    model_config = ConfigDict(
+        frozen=True,
+        populate_by_name=True,
+        json_schema_extra={
             "example": {
                 "_id": "507f1f77bcf86cd799439011",
                 "titulo": "Desarrollador Full Stack Junior",
@@ -224,4 +234,5 @@ class VacancyPublic(BaseModel):
                 "fecha_publicacion": "2025-10-16T10:30:00",
                 "num_vacantes": 2
             }
-        }
\ No newline at end of file
+        },
+    )
\ No newline at end of file
@@ -3,15 +3,20 @@ Router de Autenticación
 Endpoints para registro, login, y gestión de usuarios
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional
+import asyncio
+import logging
 import pyotp
 import qrcode
+import qrcode.image.svg
 import hashlib
 from io import BytesIO
 import base64
-from jose import JWTError, jwt
+from jwt import InvalidTokenError as JWTError
+from pymongo.errors import DuplicateKeyError
 
 from app.models.user import (
     UserCreate,
@@ -19,6 +24,7 @@ from app.models.user import (
     UserInDB,
     UserResponse,
     Token,
+    RefreshTokenRequest,
     TokenData
 )
 from app.database import get_users_collection
@@ -35,25 +41,81 @@ from app.database import get_refresh_tokens_collection
 # )
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 
 # Mover helpers de autenticación a módulo de seguridad
 from app.security.auth import (
     verify_password,
     get_password_hash,
+    password_needs_rehash,
     create_access_token,
     create_refresh_token,
+    decode_token_cached,
     get_current_user,
 )
 
-# Rate limiter
+# Rate limiter (límites leídos una vez: slowapi parsea un str al decorar y
+# un callable en cada petición)
 from app.limiter import limiter
 
+REGISTER_LIMIT = settings.auth_register_limit
+LOGIN_LIMIT = settings.auth_login_limit
+
+
+# ============= FUNCIONES AUXILIARES =============
+
+# Referencias a tareas en segundo plano (asyncio solo guarda referencias débiles)
+_background_tasks = set()
+
+
+def run_in_background(coro, description: str) -> None:
+    """Lanzar una escritura sin esperarla; los errores solo se registran"""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    
+    def _done(t: asyncio.Task) -> None:
+        _background_tasks.discard(t)
+        if not t.cancelled() and t.exception() is not None:
+            logger.warning("Error en segundo plano (%s): %s", description, t.exception())
+    
+    task.add_done_callback(_done)
+
+
+# Instancias TOTP por usuario (reintentos de /verify-mfa no reconstruyen el
+# secreto base32). Se invalida al cambiar o desactivar el secreto.
+_TOTP_CACHE_MAX = 1024
+_totp_cache: Dict[str, pyotp.TOTP] = {}
+
+
+def get_totp(user_id, secret: str) -> pyotp.TOTP:
+    """TOTP cacheado del usuario (se recrea si el secreto cambió)"""
+    key = str(user_id)
+    totp = _totp_cache.get(key)
+    if totp is None or totp.secret != secret:
+        if len(_totp_cache) >= _TOTP_CACHE_MAX:
+            # Descartar la entrada más antigua
+            del _totp_cache[next(iter(_totp_cache))]
+        totp = _totp_cache[key] = pyotp.TOTP(secret)
+    return totp
+
+
+def render_qr_svg(data: str) -> str:
+    """QR como data URI SVG (vectorial: sin Pillow ni rasterizar PNG)"""
+    qr = qrcode.QRCode(version=1, box_size=10, border=5)
+    qr.add_data(data)
+    qr.make(fit=True)
+    
+    img = qr.make_image(image_factory=qrcode.image.svg.SvgPathImage)
+    buffered = BytesIO()
+    img.save(buffered)
+    return f"data:image/svg+xml;base64,{base64.b64encode(buffered.getvalue()).decode()}"
+
 
 # ============= ENDPOINTS =============
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-@limiter.limit(lambda: settings.auth_register_limit)
+@limiter.limit(REGISTER_LIMIT)
 async def register(request: Request, user: UserCreate):
     """
     Registrar nuevo usuario
@@ -63,54 +125,35 @@ async def register(request: Request, user: UserCreate):
     - **password**: Contraseña (mínimo 8 caracteres)
     - **role**: estudiante, empresa, o admin
     """
-    print(f"\nAttempting to register user: {user.json()}")
     users = await get_users_collection()
     
-    # Verificar si el usuario ya existe
-    existing_user = await users.find_one({
-        "$or": [
-            {"email": user.email},
-            {"username": user.username}
-        ]
-    })
-    if existing_user:
-        print(f"Found existing user: {existing_user}")
-    
-    if existing_user:
-        if existing_user.get("email") == user.email:
+    # Crear usuario (el hash es CPU-bound: fuera del event loop)
+    user_dict = user.dict()
+    user_dict["hashed_password"] = await run_in_threadpool(get_password_hash, user.password)
+    del user_dict["password"]
+    user_dict["created_at"] = datetime.utcnow()
+    user_dict["mfa_enabled"] = False
+    
+    # Los índices únicos de email/username rechazan duplicados en el mismo insert
+    try:
+        result = await users.insert_one(user_dict)
+    except DuplicateKeyError as e:
+        if "email" in (e.details or {}).get("keyPattern", {}):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already registered"
             )
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Username already taken"
-            )
-    
-    # Validar rol
-    valid_roles = ["estudiante", "empresa", "admin"]
-    if user.role not in valid_roles:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid role. Must be one of: {', '.join(valid_roles)}"
+            detail="Username already taken"
         )
-    
-    # Crear usuario
-    user_dict = user.dict()
-    user_dict["hashed_password"] = get_password_hash(user.password)
-    del user_dict["password"]
-    user_dict["created_at"] = datetime.utcnow()
-    user_dict["mfa_enabled"] = False
-    
-    result = await users.insert_one(user_dict)
     user_dict["_id"] = str(result.inserted_id)
     
     return UserResponse(**user_dict)
 
 
 @router.post("/login", response_model=Token)
-@limiter.limit(lambda: settings.auth_login_limit)
+@limiter.limit(LOGIN_LIMIT)
 async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
     """
     Login de usuario
@@ -119,10 +162,15 @@ async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends
     """
     users = await get_users_collection()
     
-    # Buscar usuario
-    user = await users.find_one({"username": form_data.username})
+    # Buscar usuario (solo los campos que usa el login; sin mfa_secret)
+    user = await users.find_one(
+        {"username": form_data.username},
+        {"username": 1, "hashed_password": 1, "is_active": 1, "role": 1, "mfa_enabled": 1}
+    )
     
-    if not user or not verify_password(form_data.password, user.get("hashed_password")):
+    if not user or not await run_in_threadpool(
+        verify_password, form_data.password, user.get("hashed_password")
+    ):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -152,14 +200,27 @@ async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends
 
     # Persist refresh token metadata so it can be revoked/rotated
     refresh_tokens = await get_refresh_tokens_collection()
-    issued_at = datetime.utcnow()
-    expires_at = issued_at + timedelta(days=settings.refresh_token_expire_days)
+    now = datetime.utcnow()
+    expires_at = now + timedelta(days=settings.refresh_token_expire_days)
+    
+    # Actualizar último login (y migrar hashes bcrypt/antiguos a Argon2id)
+    # sin esperar: el cliente no necesita esta escritura para recibir sus tokens
+    login_update = {"last_login": now}
+    if password_needs_rehash(user["hashed_password"]):
+        login_update["hashed_password"] = await run_in_threadpool(
+            get_password_hash, form_data.password
+        )
+    run_in_background(
+        users.update_one({"_id": user["_id"]}, {"$set": login_update}),
+        "actualizar last_login"
+    )
+    
     try:
         await refresh_tokens.insert_one({
             "jti": jti,
             "user_id": user["_id"],
             "username": user["username"],
-            "issued_at": issued_at,
+            "issued_at": now,
             "expires_at": expires_at,
             "revoked": False,
         })
@@ -168,12 +229,6 @@ async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends
         # The token will be valid until it expires server-side; however, revocation won't work
         pass
     
-    # Actualizar último login
-    await users.update_one(
-        {"_id": user["_id"]},
-        {"$set": {"last_login": datetime.utcnow()}}
-    )
-    
     return Token(
         access_token=access_token,
         refresh_token=refresh_token,
@@ -194,7 +249,7 @@ async def get_current_user_info(current_user: UserInDB = Depends(get_current_use
 
 
 @router.post("/refresh", response_model=Token)
-async def refresh_token(refresh_token: str):
+async def refresh_token(body: RefreshTokenRequest):
     """
     Refrescar access token usando refresh token
     """
@@ -205,7 +260,7 @@ async def refresh_token(refresh_token: str):
     )
     
     try:
-        payload = jwt.decode(refresh_token, settings.secret_key, algorithms=[settings.algorithm])
+        payload = decode_token_cached(body.refresh_token)
         username: str = payload.get("sub")
         jti: str = payload.get("jti")
         if username is None or jti is None:
@@ -214,7 +269,7 @@ async def refresh_token(refresh_token: str):
         raise credentials_exception
     
     users = await get_users_collection()
-    user = await users.find_one({"username": username})
+    user = await users.find_one({"username": username}, {"username": 1, "role": 1})
     
     if user is None:
         raise credentials_exception
@@ -233,19 +288,25 @@ async def refresh_token(refresh_token: str):
         data={"sub": user["username"]}
     )
 
-    # Persist new refresh token and revoke old one
-    issued_at = datetime.utcnow()
-    expires_at = issued_at + timedelta(days=settings.refresh_token_expire_days)
+    # Persist new refresh token and revoke old one (concurrently)
+    now = datetime.utcnow()
+    expires_at = now + timedelta(days=settings.refresh_token_expire_days)
     try:
-        await refresh_tokens.insert_one({
-            "jti": new_jti,
-            "user_id": user["_id"],
-            "username": user["username"],
-            "issued_at": issued_at,
-            "expires_at": expires_at,
-            "revoked": False,
-        })
-        await refresh_tokens.update_one({"jti": jti}, {"$set": {"revoked": True}})
+        await asyncio.gather(
+            refresh_tokens.insert_one({
+                "jti": new_jti,
+                "user_id": user["_id"],
+                "username": user["username"],
+                "issued_at": now,
+                "expires_at": expires_at,
+                "revoked": False,
+            }),
+            # expires_at = ahora: el índice TTL lo purga en la siguiente pasada
+            refresh_tokens.update_one(
+                {"jti": jti},
+                {"$set": {"revoked": True, "expires_at": now}}
+            )
+        )
     except Exception:
         # If DB operations fail, still continue but revocation/rotation may not be recorded
         pass
@@ -258,13 +319,13 @@ async def refresh_token(refresh_token: str):
 
 
 @router.post("/logout")
-async def logout(refresh_token: str):
+async def logout(body: RefreshTokenRequest):
     """
     Revoke a refresh token (logout).
     The client should send the refresh token to be revoked.
     """
     try:
-        payload = jwt.decode(refresh_token, settings.secret_key, algorithms=[settings.algorithm])
+        payload = decode_token_cached(body.refresh_token)
         jti: str = payload.get("jti")
         if jti is None:
             return {"message": "Invalid token"}
@@ -272,7 +333,11 @@ async def logout(refresh_token: str):
         return {"message": "Invalid token"}
 
     refresh_tokens = await get_refresh_tokens_collection()
-    result = await refresh_tokens.update_one({"jti": jti}, {"$set": {"revoked": True}})
+    # expires_at = ahora: el índice TTL lo purga en la siguiente pasada
+    result = await refresh_tokens.update_one(
+        {"jti": jti, "revoked": False},
+        {"$set": {"revoked": True, "expires_at": datetime.utcnow()}}
+    )
     if result.modified_count:
         return {"message": "Refresh token revoked"}
     else:
@@ -297,17 +362,11 @@ async def setup_mfa(current_user: UserInDB = Depends(get_current_user)):
         issuer_name=settings.university_name
     )
     
-    # Generar QR code
-    qr = qrcode.QRCode(version=1, box_size=10, border=5)
-    qr.add_data(totp_uri)
-    qr.make(fit=True)
-    
-    img = qr.make_image(fill_color="black", back_color="white")
-    buffered = BytesIO()
-    img.save(buffered, format="PNG")
-    img_str = base64.b64encode(buffered.getvalue()).decode()
+    # Generar QR code (fuera del event loop)
+    qr_code = await run_in_threadpool(render_qr_svg, totp_uri)
     
     # Guardar secreto (pero no activar aún)
+    _totp_cache.pop(str(current_user.id), None)
     await users.update_one(
         {"_id": current_user.id},
         {"$set": {"mfa_secret": secret}}
@@ -315,7 +374,7 @@ async def setup_mfa(current_user: UserInDB = Depends(get_current_user)):
     
     return {
         "secret": secret,
-        "qr_code": f"data:image/png;base64,{img_str}",
+        "qr_code": qr_code,
         "message": "Scan the QR code with Google Authenticator and verify with /verify-mfa"
     }
 
@@ -337,7 +396,7 @@ async def verify_mfa(
         )
     
     # Verificar token
-    totp = pyotp.TOTP(current_user.mfa_secret)
+    totp = get_totp(current_user.id, current_user.mfa_secret)
     if not totp.verify(token, valid_window=1):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -364,13 +423,14 @@ async def disable_mfa(
     users = await get_users_collection()
     
     # Verificar contraseña
-    if not verify_password(password, current_user.hashed_password):
+    if not await run_in_threadpool(verify_password, password, current_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect password"
         )
     
     # Desactivar MFA
+    _totp_cache.pop(str(current_user.id), None)
     await users.update_one(
         {"_id": current_user.id},
         {"$set": {
@@ -394,7 +454,9 @@ async def change_password(
     users = await get_users_collection()
     
     # Verificar contraseña actual
-    if not verify_password(current_password, current_user.hashed_password):
+    if not await run_in_threadpool(
+        verify_password, current_password, current_user.hashed_password
+    ):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect current password"
@@ -408,7 +470,7 @@ async def change_password(
         )
     
     # Actualizar contraseña
-    new_hashed_password = get_password_hash(new_password)
+    new_hashed_password = await run_in_threadpool(get_password_hash, new_password)
     await users.update_one(
         {"_id": current_user.id},
         {"$set": {"hashed_password": new_hashed_password}}
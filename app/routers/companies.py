@@ -1,10 +1,11 @@
 """
 Router de Empresas con endpoint de verificación corregido
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from typing import List, Optional
 from datetime import datetime
 from bson import ObjectId
+from pymongo import ReturnDocument
 
 from app.models.company import (
     CompanyCreate,
@@ -14,27 +15,50 @@ from app.models.company import (
 )
 from app.models.user import UserInDB
 from app.database import get_companies_collection
-from app.routers.auth import get_current_user
+from app.security.auth import require_role
 
 router = APIRouter()
 
+# Solo los campos de CompanyInDB (_id siempre viene)
+COMPANY_IN_DB_PROJECTION = {name: 1 for name in CompanyInDB.model_fields if name != "id"}
+
+
+# ============= FUNCIONES AUXILIARES =============
+
+def company_response(company: dict) -> CompanyResponse:
+    """
+    CompanyResponse desde un documento de MongoDB, sin re-validar
+    
+    Los datos ya se validaron al guardarse; FastAPI tampoco re-valida una
+    instancia del propio response_model, solo la serializa. Por eso aquí se
+    mapean los nombres con que se guardan las fechas (fecha_registro,
+    fecha_actualizacion) a los del modelo: model_construct no avisa si falta
+    un campo requerido
+    """
+    company_id = company["_id"]
+    company["_id"] = str(company_id)
+    company["user_id"] = str(company["user_id"])
+    if "created_at" not in company:
+        # Perfiles sin fecha_registro: el _id trae la fecha de creación
+        company["created_at"] = company.get("fecha_registro") or company_id.generation_time
+    if "updated_at" not in company and "fecha_actualizacion" in company:
+        company["updated_at"] = company["fecha_actualizacion"]
+    return CompanyResponse.model_construct(**company)
+
 
 # ============= FUNCIÓN DE DEPENDENCIA =============
 
-async def get_current_company(current_user: UserInDB = Depends(get_current_user)) -> CompanyInDB:
+async def get_current_company(current_user: UserInDB = Depends(require_role("empresa"))) -> CompanyInDB:
     """
     Obtener empresa del usuario actual (solo empresas)
     """
-    if current_user.role != "empresa":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only company users can access this endpoint"
-        )
-    
     companies = await get_companies_collection()
     
     # Buscar empresa asociada al user_id
-    company = await companies.find_one({"user_id": ObjectId(current_user.id)})
+    company = await companies.find_one(
+        {"user_id": ObjectId(current_user.id)},
+        COMPANY_IN_DB_PROJECTION
+    )
     
     if not company:
         raise HTTPException(
@@ -50,17 +74,11 @@ async def get_current_company(current_user: UserInDB = Depends(get_current_user)
 @router.post("/profile", response_model=CompanyResponse, status_code=status.HTTP_201_CREATED)
 async def create_company_profile(
     company_data: CompanyCreate,
-    current_user: UserInDB = Depends(get_current_user)
+    current_user: UserInDB = Depends(require_role("empresa"))
 ):
     """
     Crear perfil de empresa (solo usuarios empresa)
     """
-    if current_user.role != "empresa":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only company users can create company profiles"
-        )
-    
     companies = await get_companies_collection()
     
     # Verificar si ya existe perfil para este usuario
@@ -83,11 +101,7 @@ async def create_company_profile(
     result = await companies.insert_one(company_dict)
     created_company = await companies.find_one({"_id": result.inserted_id})
     
-    # Convertir ObjectIds a string
-    created_company["_id"] = str(created_company["_id"])
-    created_company["user_id"] = str(created_company["user_id"])
-    
-    return CompanyResponse(**created_company)
+    return company_response(created_company)
 
 
 @router.get("/profile", response_model=CompanyResponse)
@@ -98,6 +112,8 @@ async def get_company_profile(current_company: CompanyInDB = Depends(get_current
     company_dict = current_company.dict()
     company_dict["_id"] = str(current_company.id)
     company_dict["user_id"] = str(current_company.user_id)
+    if current_company.sitio_web is not None:
+        company_dict["sitio_web"] = str(current_company.sitio_web)
     return CompanyResponse(**company_dict)
 
 
@@ -115,72 +131,73 @@ async def update_company_profile(
     update_dict = {k: v for k, v in update_data.dict().items() if v is not None}
     update_dict["fecha_actualizacion"] = datetime.utcnow()
     
-    await companies.update_one(
+    # Actualizar y obtener el documento resultante en un solo round-trip
+    updated_company = await companies.find_one_and_update(
         {"_id": ObjectId(current_company.id)},
-        {"$set": update_dict}
+        {"$set": update_dict},
+        return_document=ReturnDocument.AFTER
     )
     
-    updated_company = await companies.find_one({"_id": ObjectId(current_company.id)})
-    
-    # Convertir ObjectIds a string
-    updated_company["_id"] = str(updated_company["_id"])
-    updated_company["user_id"] = str(updated_company["user_id"])
+    if not updated_company:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Company profile not found"
+        )
     
-    return CompanyResponse(**updated_company)
+    return company_response(updated_company)
 
 
 # ============= ENDPOINTS ADMIN =============
 
 @router.get("/admin/all", response_model=List[CompanyResponse])
 async def get_all_companies(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     verified: Optional[bool] = Query(None, description="Filtrar por verificadas"),
-    current_user: UserInDB = Depends(get_current_user)
+    after: Optional[str] = Query(None, description="Cursor: _id de la última empresa recibida"),
+    current_user: UserInDB = Depends(require_role("admin"))
 ):
     """
     Listar todas las empresas (solo admin)
-    """
-    if current_user.role != "admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only admins can access this endpoint"
-        )
     
+    Paginación por cursor: pasar en `after` el valor del header X-Next-Cursor
+    (no recorre las páginas anteriores como `skip`)
+    """
     companies = await get_companies_collection()
     
     filters = {}
     if verified is not None:
         filters["verificada"] = verified
     
-    company_list = await companies.find(filters).skip(skip).limit(limit).to_list(length=limit)
+    if after is not None:
+        if not ObjectId.is_valid(after):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid cursor: {after}"
+            )
+        filters["_id"] = {"$gt": ObjectId(after)}
+        skip = 0
+    
+    company_list = await companies.find(filters).sort("_id", 1).skip(skip).limit(limit).to_list(length=limit)
     
-    # Convertir ObjectId a string antes de crear CompanyResponse
-    result = []
-    for company in company_list:
-        company["_id"] = str(company["_id"])
-        company["user_id"] = str(company["user_id"])
-        result.append(CompanyResponse(**company))
+    # Página llena: puede haber más, el cliente sigue desde la última
+    if company_list and len(company_list) == limit:
+        response.headers["X-Next-Cursor"] = str(company_list[-1]["_id"])
     
-    return result
+    return [company_response(company) for company in company_list]
 
 
 @router.put("/{company_id}/verify", response_model=CompanyResponse)
 async def verify_company(
     company_id: str,
-    current_user: UserInDB = Depends(get_current_user)
+    current_user: UserInDB = Depends(require_role("admin"))
 ):
     """
     Verificar empresa (solo admin)
     
     CORREGIDO: Valida ObjectId antes de buscar
     """
-    if current_user.role != "admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only admins can verify companies"
-        )
-    
     # ⭐ VALIDAR que el ID sea válido ANTES de buscar
     if not ObjectId.is_valid(company_id):
         raise HTTPException(
@@ -190,49 +207,35 @@ async def verify_company(
     
     companies = await get_companies_collection()
     
-    # Buscar empresa
-    company = await companies.find_one({"_id": ObjectId(company_id)})
-    
-    if not company:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Company with ID {company_id} not found"
-        )
-    
-    # Actualizar verificación
-    await companies.update_one(
+    # Actualizar verificación y obtener empresa actualizada (atómico, un round-trip)
+    now = datetime.utcnow()
+    updated_company = await companies.find_one_and_update(
         {"_id": ObjectId(company_id)},
         {"$set": {
             "verificada": True,
-            "fecha_verificacion": datetime.utcnow(),
-            "fecha_actualizacion": datetime.utcnow()
-        }}
+            "fecha_verificacion": now,
+            "fecha_actualizacion": now
+        }},
+        return_document=ReturnDocument.AFTER
     )
     
-    # Obtener empresa actualizada
-    updated_company = await companies.find_one({"_id": ObjectId(company_id)})
-    
-    # Convertir ObjectIds a string
-    updated_company["_id"] = str(updated_company["_id"])
-    updated_company["user_id"] = str(updated_company["user_id"])
+    if not updated_company:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Company with ID {company_id} not found"
+        )
     
-    return CompanyResponse(**updated_company)
+    return company_response(updated_company)
 
 
 @router.put("/{company_id}/unverify", response_model=CompanyResponse)
 async def unverify_company(
     company_id: str,
-    current_user: UserInDB = Depends(get_current_user)
+    current_user: UserInDB = Depends(require_role("admin"))
 ):
     """
     Desverificar empresa (solo admin)
     """
-    if current_user.role != "admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only admins can unverify companies"
-        )
-    
     # ⭐ VALIDAR ObjectId
     if not ObjectId.is_valid(company_id):
         raise HTTPException(
@@ -242,46 +245,33 @@ async def unverify_company(
     
     companies = await get_companies_collection()
     
-    company = await companies.find_one({"_id": ObjectId(company_id)})
-    
-    if not company:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Company with ID {company_id} not found"
-        )
-    
-    await companies.update_one(
+    updated_company = await companies.find_one_and_update(
         {"_id": ObjectId(company_id)},
         {"$set": {
             "verificada": False,
             "fecha_verificacion": None,
             "fecha_actualizacion": datetime.utcnow()
-        }}
+        }},
+        return_document=ReturnDocument.AFTER
     )
     
-    updated_company = await companies.find_one({"_id": ObjectId(company_id)})
-    
-    # Convertir ObjectIds a string
-    updated_company["_id"] = str(updated_company["_id"])
-    updated_company["user_id"] = str(updated_company["user_id"])
+    if not updated_company:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Company with ID {company_id} not found"
+        )
     
-    return CompanyResponse(**updated_company)
+    return company_response(updated_company)
 
 
 @router.delete("/{company_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_company(
     company_id: str,
-    current_user: UserInDB = Depends(get_current_user)
+    current_user: UserInDB = Depends(require_role("admin"))
 ):
     """
     Eliminar empresa (solo admin)
     """
-    if current_user.role != "admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only admins can delete companies"
-        )
-    
     # ⭐ VALIDAR ObjectId
     if not ObjectId.is_valid(company_id):
         raise HTTPException(
@@ -303,24 +293,26 @@ async def delete_company(
 
 
 @router.get("/admin/stats", response_model=dict)
-async def get_company_stats(current_user: UserInDB = Depends(get_current_user)):
+async def get_company_stats(current_user: UserInDB = Depends(require_role("admin"))):
     """
     Estadísticas de empresas (solo admin)
     """
-    if current_user.role != "admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only admins can access this endpoint"
-        )
-    
     companies = await get_companies_collection()
     
-    total = await companies.count_documents({})
-    verified = await companies.count_documents({"verificada": True})
-    pending = await companies.count_documents({"verificada": False})
+    # Los tres conteos en una sola pasada y un solo round-trip
+    pipeline = [
+        {"$group": {
+            "_id": None,
+            "total": {"$sum": 1},
+            "verified": {"$sum": {"$cond": [{"$eq": ["$verificada", True]}, 1, 0]}},
+            "pending": {"$sum": {"$cond": [{"$eq": ["$verificada", False]}, 1, 0]}}
+        }}
+    ]
+    counts = await companies.aggregate(pipeline).to_list(length=1)
+    stats = counts[0] if counts else {"total": 0, "verified": 0, "pending": 0}
     
     return {
-        "total_companies": total,
-        "verified": verified,
-        "pending_verification": pending
+        "total_companies": stats["total"],
+        "verified": stats["verified"],
+        "pending_verification": stats["pending"]
     }
\ No newline at end of file
@@ -2,10 +2,13 @@
 Router de Solicitudes de Contacto
 Sistema para que empresas soliciten información de contacto de estudiantes
 """
+import asyncio
+import time
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 
 from app.models.contact_request import (
     ContactRequestCreate,
@@ -21,14 +24,122 @@ from app.database import (
     get_contact_requests_collection,
     get_matches_collection,
     get_students_collection,
-    get_vacancies_collection,
-    get_companies_collection
+    get_vacancies_collection
 )
-from app.routers.auth import get_current_user
+from app.security.auth import require_role
 from app.routers.companies import get_current_company
 
 router = APIRouter()
 
+# Estadísticas admin: "stats" -> (expira, respuesta).
+# Los paneles consultan seguido; se recalculan como mucho cada STATS_TTL_SECONDS
+# y se invalidan al crear, revisar o eliminar solicitudes.
+STATS_TTL_SECONDS = 30
+_stats_cache: Dict[str, Tuple[float, dict]] = {}
+
+# Campos del estudiante que usa StudentContactInfo (el email viene de users)
+STUDENT_CONTACT_PROJECTION = {
+    name: 1 for name in StudentContactInfo.model_fields if name not in ("email", "cv_url")
+}
+STUDENT_CONTACT_PROJECTION["cv_filename"] = 1
+
+
+async def list_with_counts(
+    contact_requests,
+    scope: dict,
+    estado: Optional[str],
+    skip: int,
+    limit: int,
+    join_company: bool = True
+):
+    """
+    Página de solicitudes y contadores por estado en una sola agregación
+
+    Los contadores cubren todo el alcance (scope), sin el filtro de estado.
+    La página ya trae el título de la vacante y, si se pide, el nombre de la empresa
+    """
+    page_match = {"estado": estado} if estado else {}
+    page = [
+        {"$match": page_match},
+        {"$sort": {"fecha_solicitud": -1}},
+        {"$skip": skip},
+        {"$limit": limit},
+        {"$lookup": {
+            "from": "vacancies",
+            "localField": "vacancy_id",
+            "foreignField": "_id",
+            "as": "vac",
+            "pipeline": [{"$project": {"titulo": 1}}]
+        }}
+    ]
+    projection = {
+        "vacancy_titulo": {"$ifNull": [{"$arrayElemAt": ["$vac.titulo", 0]}, "Vacante"]},
+        "student_matricula": 1,
+        "estado": 1,
+        "fecha_solicitud": 1,
+        "fecha_respuesta": 1,
+        "motivo": 1,
+        "comentario_admin": 1
+    }
+    
+    if join_company:
+        page.append({"$lookup": {
+            "from": "companies",
+            "localField": "company_id",
+            "foreignField": "_id",
+            "as": "comp",
+            "pipeline": [{"$project": {"nombre_empresa": 1}}]
+        }})
+        projection["company_nombre"] = {
+            "$ifNull": [{"$arrayElemAt": ["$comp.nombre_empresa", 0]}, "Empresa"]
+        }
+    
+    page.append({"$project": projection})
+    
+    pipeline = [
+        {"$match": scope},
+        {"$facet": {
+            "page": page,
+            "counts": [
+                {"$group": {"_id": "$estado", "count": {"$sum": 1}}}
+            ]
+        }}
+    ]
+    
+    facet = (await contact_requests.aggregate(pipeline).to_list(length=1))[0]
+    counts = {row["_id"]: row["count"] for row in facet["counts"]}
+    return facet["page"], counts
+
+
+async def parse_request_id(request_id: str) -> ObjectId:
+    """
+    Dependencia: request_id de la ruta como ObjectId (400 si no es válido)
+    
+    Declararla después de la dependencia de autenticación: FastAPI resuelve en
+    orden y un id inválido no debe responder 400 antes que 401/403
+    """
+    if not ObjectId.is_valid(request_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid request ID"
+        )
+    return ObjectId(request_id)
+
+
+def contact_request_response(row: dict, company_nombre: Optional[str] = None) -> ContactRequestResponse:
+    """Construir la respuesta a partir de una fila de list_with_counts, sin re-validar"""
+    return ContactRequestResponse.model_construct(
+        id=str(row["_id"]),
+        vacancy_titulo=row["vacancy_titulo"],
+        company_nombre=company_nombre or row["company_nombre"],
+        student_matricula=row["student_matricula"],
+        estado=row["estado"],
+        fecha_solicitud=row["fecha_solicitud"],
+        fecha_respuesta=row.get("fecha_respuesta"),
+        motivo=row.get("motivo"),
+        comentario_admin=row.get("comentario_admin")
+    )
+
 
 # ============= ENDPOINTS PARA EMPRESAS =============
 
@@ -57,7 +168,17 @@ async def create_contact_request(
             detail="Invalid vacancy ID"
         )
     
-    vacancy = await vacancies.find_one({"_id": ObjectId(request_data.vacancy_id)})
+    vacancy_oid = ObjectId(request_data.vacancy_id)
+    
+    # Las tres consultas son independientes entre sí
+    vacancy, match, student = await asyncio.gather(
+        vacancies.find_one({"_id": vacancy_oid}, {"company_id": 1}),
+        matches.find_one({
+            "vacancy_id": vacancy_oid,
+            "student_matricula": request_data.student_matricula
+        }, {"_id": 1}),
+        students.find_one({"matricula": request_data.student_matricula}, {"_id": 1})
+    )
     
     if not vacancy:
         raise HTTPException(
@@ -72,11 +193,6 @@ async def create_contact_request(
         )
     
     # Verificar que existe un match entre la vacante y el estudiante
-    match = await matches.find_one({
-        "vacancy_id": ObjectId(request_data.vacancy_id),
-        "student_matricula": request_data.student_matricula
-    })
-    
     if not match:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -84,30 +200,15 @@ async def create_contact_request(
         )
     
     # Verificar que el estudiante existe
-    student = await students.find_one({"matricula": request_data.student_matricula})
-    
     if not student:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Student not found"
         )
     
-    # Verificar que no existe una solicitud previa
-    existing_request = await contact_requests.find_one({
-        "vacancy_id": ObjectId(request_data.vacancy_id),
-        "student_matricula": request_data.student_matricula,
-        "company_id": current_company.id
-    })
-    
-    if existing_request:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Contact request already exists with status: {existing_request['estado']}"
-        )
-    
     # Crear solicitud
     request_doc = {
-        "vacancy_id": ObjectId(request_data.vacancy_id),
+        "vacancy_id": vacancy_oid,
         "company_id": current_company.id,
         "student_matricula": request_data.student_matricula,
         "motivo": request_data.motivo,
@@ -119,14 +220,30 @@ async def create_contact_request(
         "motivo_rechazo": None
     }
     
-    result = await contact_requests.insert_one(request_doc)
+    # El índice único (vacante, estudiante, empresa) rechaza la solicitud previa
+    # (también entre dos peticiones simultáneas) sin una consulta extra
+    try:
+        result = await contact_requests.insert_one(request_doc)
+    except DuplicateKeyError:
+        existing_request = await contact_requests.find_one({
+            "vacancy_id": vacancy_oid,
+            "student_matricula": request_data.student_matricula,
+            "company_id": current_company.id
+        }, {"estado": 1})
+        estado = existing_request["estado"] if existing_request else "pendiente"
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Contact request already exists with status: {estado}"
+        )
     
-    # Actualizar contador en la vacante
+    # Actualizar contador en la vacante (solo si se insertó)
     await vacancies.update_one(
-        {"_id": ObjectId(request_data.vacancy_id)},
+        {"_id": vacancy_oid},
         {"$inc": {"num_solicitudes_contacto": 1}}
     )
     
+    _stats_cache.clear()
+    
     return {
         "message": "Contact request created successfully",
         "request_id": str(result.inserted_id),
@@ -146,54 +263,31 @@ async def get_my_contact_requests(
     Obtener mis solicitudes de contacto
     """
     contact_requests = await get_contact_requests_collection()
-    vacancies = await get_vacancies_collection()
     
-    # Filtros
-    filters = {"company_id": current_company.id}
-    if estado:
-        filters["estado"] = estado
-    
-    # Obtener solicitudes
-    requests_list = await contact_requests.find(filters).sort(
-        "fecha_solicitud", -1
-    ).skip(skip).limit(limit).to_list(length=limit)
-    
-    # Construir respuesta
-    result = []
-    for req in requests_list:
-        vacancy = await vacancies.find_one({"_id": req["vacancy_id"]})
-        
-        result.append(ContactRequestResponse(
-            _id=str(req["_id"]),
-            vacancy_titulo=vacancy.get("titulo", "Vacante") if vacancy else "Vacante",
-            company_nombre=current_company.nombre_empresa,
-            student_matricula=req["student_matricula"],
-            estado=req["estado"],
-            fecha_solicitud=req["fecha_solicitud"],
-            fecha_respuesta=req.get("fecha_respuesta"),
-            motivo=req.get("motivo"),
-            comentario_admin=req.get("comentario_admin")
-        ))
-    
-    # Contadores
-    total = await contact_requests.count_documents({"company_id": current_company.id})
-    pendientes = await contact_requests.count_documents({"company_id": current_company.id, "estado": "pendiente"})
-    aprobadas = await contact_requests.count_documents({"company_id": current_company.id, "estado": "aprobada"})
-    rechazadas = await contact_requests.count_documents({"company_id": current_company.id, "estado": "rechazada"})
+    # Solicitudes (con título de vacante) y contadores
+    requests_list, counts = await list_with_counts(
+        contact_requests, {"company_id": current_company.id}, estado, skip, limit,
+        join_company=False
+    )
+    
+    result = [
+        contact_request_response(row, current_company.nombre_empresa)
+        for row in requests_list
+    ]
     
     return ContactRequestList(
-        total=total,
-        pendientes=pendientes,
-        aprobadas=aprobadas,
-        rechazadas=rechazadas,
+        total=sum(counts.values()),
+        pendientes=counts.get("pendiente", 0),
+        aprobadas=counts.get("aprobada", 0),
+        rechazadas=counts.get("rechazada", 0),
         solicitudes=result
     )
 
 
 @router.get("/student-contact/{request_id}", response_model=StudentContactInfo)
 async def get_student_contact_info(
-    request_id: str,
-    current_company: CompanyInDB = Depends(get_current_company)
+    current_company: CompanyInDB = Depends(get_current_company),
+    request_oid: ObjectId = Depends(parse_request_id)
 ):
     """
     Obtener información de contacto del estudiante
@@ -203,14 +297,11 @@ async def get_student_contact_info(
     contact_requests = await get_contact_requests_collection()
     students = await get_students_collection()
     
-    if not ObjectId.is_valid(request_id):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid request ID"
-        )
-    
     # Obtener solicitud
-    request = await contact_requests.find_one({"_id": ObjectId(request_id)})
+    request = await contact_requests.find_one(
+        {"_id": request_oid},
+        {"company_id": 1, "estado": 1, "student_matricula": 1}
+    )
     
     if not request:
         raise HTTPException(
@@ -232,24 +323,36 @@ async def get_student_contact_info(
             detail=f"Contact request is {request['estado']}. Must be approved to access contact info"
         )
     
-    # Obtener información del estudiante
-    student = await students.find_one({"matricula": request["student_matricula"]})
+    # Estudiante y email de su usuario en una sola consulta
+    pipeline = [
+        {"$match": {"matricula": request["student_matricula"]}},
+        {"$limit": 1},
+        {"$lookup": {
+            "from": "users",
+            "localField": "user_id",
+            "foreignField": "_id",
+            "as": "user",
+            "pipeline": [{"$project": {"email": 1}}]
+        }},
+        {"$project": {
+            **STUDENT_CONTACT_PROJECTION,
+            "email": {"$ifNull": [{"$arrayElemAt": ["$user.email", 0]}, ""]}
+        }}
+    ]
+    rows = await students.aggregate(pipeline).to_list(length=1)
     
-    if not student:
+    if not rows:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Student not found"
         )
     
-    # Obtener datos de usuario para email
-    from app.database import get_users_collection
-    users = await get_users_collection()
-    user = await users.find_one({"_id": student["user_id"]})
+    student = rows[0]
     
     return StudentContactInfo(
         matricula=student["matricula"],
         nombre_completo=student.get("nombre_completo", ""),
-        email=user.get("email", "") if user else "",
+        email=student["email"],
         telefono=student.get("telefono", ""),
         carrera=student.get("carrera", ""),
         semestre=student.get("semestre", 0),
@@ -267,89 +370,42 @@ async def get_all_contact_requests(
     skip: int = 0,
     limit: int = 100,
     estado: Optional[str] = Query(None, description="pendiente, aprobada, rechazada"),
-    current_user: UserInDB = Depends(get_current_user)
+    current_user: UserInDB = Depends(require_role("admin"))
 ):
     """
     Obtener todas las solicitudes de contacto (solo admin)
     """
-    if current_user.role != "admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only admins can access this endpoint"
-        )
-    
     contact_requests = await get_contact_requests_collection()
-    vacancies = await get_vacancies_collection()
-    companies = await get_companies_collection()
-    
-    # Filtros
-    filters = {}
-    if estado:
-        filters["estado"] = estado
-    
-    # Obtener solicitudes
-    requests_list = await contact_requests.find(filters).sort(
-        "fecha_solicitud", -1
-    ).skip(skip).limit(limit).to_list(length=limit)
-    
-    # Construir respuesta
-    result = []
-    for req in requests_list:
-        vacancy = await vacancies.find_one({"_id": req["vacancy_id"]})
-        company = await companies.find_one({"_id": req["company_id"]})
-        
-        result.append(ContactRequestResponse(
-            _id=str(req["_id"]),
-            vacancy_titulo=vacancy.get("titulo", "Vacante") if vacancy else "Vacante",
-            company_nombre=company.get("nombre_empresa", "Empresa") if company else "Empresa",
-            student_matricula=req["student_matricula"],
-            estado=req["estado"],
-            fecha_solicitud=req["fecha_solicitud"],
-            fecha_respuesta=req.get("fecha_respuesta"),
-            motivo=req.get("motivo"),
-            comentario_admin=req.get("comentario_admin")
-        ))
-    
-    # Contadores
-    total = await contact_requests.count_documents({})
-    pendientes = await contact_requests.count_documents({"estado": "pendiente"})
-    aprobadas = await contact_requests.count_documents({"estado": "aprobada"})
-    rechazadas = await contact_requests.count_documents({"estado": "rechazada"})
+    
+    # Solicitudes (con vacante y empresa) y contadores
+    requests_list, counts = await list_with_counts(
+        contact_requests, {}, estado, skip, limit
+    )
+    
+    result = [contact_request_response(row) for row in requests_list]
     
     return ContactRequestList(
-        total=total,
-        pendientes=pendientes,
-        aprobadas=aprobadas,
-        rechazadas=rechazadas,
+        total=sum(counts.values()),
+        pendientes=counts.get("pendiente", 0),
+        aprobadas=counts.get("aprobada", 0),
+        rechazadas=counts.get("rechazada", 0),
         solicitudes=result
     )
 
 
 @router.put("/admin/{request_id}/review", response_model=dict)
 async def review_contact_request(
-    request_id: str,
     review_data: ContactRequestUpdate,
-    current_user: UserInDB = Depends(get_current_user)
+    current_user: UserInDB = Depends(require_role("admin")),
+    request_oid: ObjectId = Depends(parse_request_id)
 ):
     """
     Aprobar o rechazar solicitud de contacto (solo admin)
     """
-    if current_user.role != "admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only admins can review contact requests"
-        )
-    
     contact_requests = await get_contact_requests_collection()
     
-    if not ObjectId.is_valid(request_id):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid request ID"
-        )
-    
     # Obtener solicitud
-    request = await contact_requests.find_one({"_id": ObjectId(request_id)})
+    request = await contact_requests.find_one({"_id": request_oid}, {"_id": 1})
     
     if not request:
         raise HTTPException(
@@ -376,83 +432,99 @@ async def review_contact_request(
         update_data["motivo_rechazo"] = review_data.motivo_rechazo
     
     await contact_requests.update_one(
-        {"_id": ObjectId(request_id)},
+        {"_id": request_oid},
         {"$set": update_data}
     )
     
+    _stats_cache.clear()
+    
     # TODO: Enviar notificación a la empresa
     # TODO: Si es aprobada, enviar notificación al estudiante
     
     return {
         "message": f"Contact request {review_data.estado}",
-        "request_id": request_id,
+        "request_id": str(request_oid),
         "estado": review_data.estado
     }
 
 
 @router.get("/admin/stats", response_model=dict)
-async def get_contact_request_stats(current_user: UserInDB = Depends(get_current_user)):
+async def get_contact_request_stats(current_user: UserInDB = Depends(require_role("admin"))):
     """
     Estadísticas de solicitudes de contacto (solo admin)
     """
-    if current_user.role != "admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only admins can access this endpoint"
-        )
+    cached = _stats_cache.get("stats")
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
     
     contact_requests = await get_contact_requests_collection()
     
-    total = await contact_requests.count_documents({})
-    pendientes = await contact_requests.count_documents({"estado": "pendiente"})
-    aprobadas = await contact_requests.count_documents({"estado": "aprobada"})
-    rechazadas = await contact_requests.count_documents({"estado": "rechazada"})
-    
-    # Empresas más activas
-    pipeline_companies = [
-        {"$group": {"_id": "$company_id", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}},
-        {"$limit": 10}
+    # Contadores por estado y empresas más activas (con nombre) en una sola agregación
+    pipeline = [
+        {"$facet": {
+            "estados": [
+                {"$group": {"_id": "$estado", "count": {"$sum": 1}}}
+            ],
+            "top": [
+                {"$group": {"_id": "$company_id", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1}},
+                {"$limit": 10},
+                {"$lookup": {
+                    "from": "companies",
+                    "localField": "_id",
+                    "foreignField": "_id",
+                    "as": "comp",
+                    "pipeline": [{"$project": {"nombre_empresa": 1}}]
+                }},
+                {"$project": {
+                    "_id": 0,
+                    "company_id": {"$toString": "$_id"},
+                    "nombre_empresa": {
+                        "$ifNull": [{"$arrayElemAt": ["$comp.nombre_empresa", 0]}, "Empresa"]
+                    },
+                    "solicitudes": "$count"
+                }}
+            ]
+        }}
     ]
     
-    top_companies = await contact_requests.aggregate(pipeline_companies).to_list(length=10)
+    facet = (await contact_requests.aggregate(pipeline).to_list(length=1))[0]
+    estados, top_companies = facet["estados"], facet["top"]
+    
+    counts = {row["_id"]: row["count"] for row in estados}
+    total = sum(counts.values())
+    pendientes = counts.get("pendiente", 0)
+    aprobadas = counts.get("aprobada", 0)
+    rechazadas = counts.get("rechazada", 0)
     
     # Tasa de aprobación
     tasa_aprobacion = (aprobadas / total * 100) if total > 0 else 0
     
-    return {
+    stats = {
         "total_solicitudes": total,
         "pendientes": pendientes,
         "aprobadas": aprobadas,
         "rechazadas": rechazadas,
         "tasa_aprobacion": round(tasa_aprobacion, 2),
-        "empresas_mas_activas": len(top_companies)
+        "empresas_mas_activas": len(top_companies),
+        "top_empresas": top_companies
     }
+    _stats_cache["stats"] = (time.monotonic() + STATS_TTL_SECONDS, stats)
+    
+    return stats
 
 
 @router.delete("/admin/{request_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_contact_request(
-    request_id: str,
-    current_user: UserInDB = Depends(get_current_user)
+    current_user: UserInDB = Depends(require_role("admin")),
+    request_oid: ObjectId = Depends(parse_request_id)
 ):
     """
     Eliminar solicitud de contacto (solo admin)
     """
-    if current_user.role != "admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only admins can delete contact requests"
-        )
-    
     contact_requests = await get_contact_requests_collection()
     
-    if not ObjectId.is_valid(request_id):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid request ID"
-        )
-    
-    result = await contact_requests.delete_one({"_id": ObjectId(request_id)})
+    result = await contact_requests.delete_one({"_id": request_oid})
     
     if result.deleted_count == 0:
         raise HTTPException(
@@ -460,4 +532,6 @@ async def delete_contact_request(
             detail="Contact request not found"
         )
     
+    _stats_cache.clear()
+    
     return None
\ No newline at end of file
@@ -6,8 +6,8 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from typing import List, Dict
 from datetime import datetime
 from bson import ObjectId
+from pymongo.errors import BulkWriteError
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 
 from app.models.match import (
     MatchCreate,
@@ -15,7 +15,11 @@ from app.models.match import (
     MatchResponse,
     MatchListResponse,
     MatchDesglose,
-    RadarChartData
+    RadarChartData,
+    IdiomaSnapshot,
+    DESGLOSE_FIELDS,
+    pack_desglose,
+    unpack_desglose
 )
 from app.models.user import UserInDB
 from app.models.company import CompanyInDB
@@ -23,17 +27,80 @@ from app.database import (
     get_matches_collection,
     get_vacancies_collection,
     get_students_collection,
+    get_student_embeddings_collection,
     get_companies_collection
 )
 from app.routers.auth import get_current_user
 from app.routers.companies import get_current_company
 from app.config import settings
+from app.services.matching import desglose_matrix, score_matrix
+from app.services.scoring import embedding_matrix, score_batch, unpack_embedding
 
 router = APIRouter()
 
+# Campos de students de los que depende student_snapshot()
+SNAPSHOT_SOURCE_FIELDS = frozenset({
+    "carrera",
+    "semestre",
+    "habilidades_tecnicas",
+    "habilidades_blandas",
+    "idiomas",
+    "experiencia_laboral",
+    "modalidad_preferida"
+})
+
+
+def student_snapshot(student: dict) -> dict:
+    """Datos anónimos del estudiante que se guardan junto a cada match"""
+    return {
+        "carrera": student.get("carrera", ""),
+        "semestre": student.get("semestre", 0),
+        "habilidades_tecnicas": student.get("habilidades_tecnicas", []),
+        "habilidades_blandas": student.get("habilidades_blandas", []),
+        "idiomas": student.get("idiomas", []),
+        "tiene_experiencia": len(student.get("experiencia_laboral", [])) > 0,
+        "modalidad_preferida": student.get("modalidad_preferida", "")
+    }
+
+
+def match_desglose(match: dict) -> dict:
+    """Desglose con nombres de un documento de match (empaquetado o no)"""
+    packed = match.get("desglose_packed")
+    if packed is not None:
+        return unpack_desglose(packed)
+    return match["desglose"]  # Matches guardados antes del formato empaquetado
+
+
+def match_response(match: dict, snapshot: dict) -> MatchResponse:
+    """
+    MatchResponse desde un match de MongoDB y su snapshot, sin re-validar
+    
+    Los datos ya se validaron al guardarse; FastAPI serializa la instancia
+    según el response_model
+    """
+    return MatchResponse.model_construct(
+        id=str(match["_id"]),
+        student_matricula=match["student_matricula"],
+        porcentaje_match=match["porcentaje_match"],
+        desglose=MatchDesglose.model_construct(**match_desglose(match)),
+        fecha_match=match["fecha_match"],
+        carrera=snapshot.get("carrera", ""),
+        semestre=snapshot.get("semestre", 0),
+        habilidades_tecnicas=snapshot.get("habilidades_tecnicas", []),
+        habilidades_blandas=snapshot.get("habilidades_blandas", []),
+        idiomas=[IdiomaSnapshot.model_construct(**idioma) for idioma in snapshot.get("idiomas", [])],
+        tiene_experiencia=snapshot.get("tiene_experiencia", False),
+        modalidad_preferida=snapshot.get("modalidad_preferida", ""),
+        radar_chart_data=match.get("radar_chart_data", {})
+    )
+
 
 # ============= FUNCIONES DE MATCHING =============
 
+# Mapeo de niveles de idioma (MCER)
+LANGUAGE_LEVELS = {"A1": 1, "A2": 2, "B1": 3, "B2": 4, "C1": 5, "C2": 6, "Nativo": 7}
+
+
 def calculate_skills_match(student_skills: List[str], required_skills: List[str]) -> float:
     """
     Calcular compatibilidad de habilidades
@@ -46,14 +113,13 @@ def calculate_skills_match(student_skills: List[str], required_skills: List[str]
     if not student_skills:
         return 0.0
     
-    # Convertir a minúsculas para comparación
-    student_skills_lower = [s.lower() for s in student_skills]
-    required_skills_lower = [s.lower() for s in required_skills]
+    # Convertir a minúsculas para comparación (set: búsqueda O(1) por habilidad)
+    student_skills_lower = {s.lower() for s in student_skills}
     
     # Contar coincidencias
-    matches = sum(1 for skill in required_skills_lower if skill in student_skills_lower)
+    matches = sum(1 for skill in required_skills if skill.lower() in student_skills_lower)
     
-    return matches / len(required_skills_lower)
+    return matches / len(required_skills)
 
 
 def calculate_language_match(student_langs: List[Dict], required_langs: List[Dict]) -> float:
@@ -68,24 +134,22 @@ def calculate_language_match(student_langs: List[Dict], required_langs: List[Dic
     if not student_langs:
         return 0.0
     
-    # Mapeo de niveles
-    level_order = {"A1": 1, "A2": 2, "B1": 3, "B2": 4, "C1": 5, "C2": 6, "Nativo": 7}
+    # Nivel más alto del estudiante por idioma
+    student_levels: Dict[str, int] = {}
+    for student_lang in student_langs:
+        student_idioma = student_lang.get("idioma", "").lower()
+        student_nivel_num = LANGUAGE_LEVELS.get(student_lang.get("nivel", "A1"), 0)
+        if student_nivel_num > student_levels.get(student_idioma, -1):
+            student_levels[student_idioma] = student_nivel_num
     
     matches = 0
     for req_lang in required_langs:
         req_idioma = req_lang.get("idioma", "").lower()
-        req_nivel = req_lang.get("nivel_minimo", "A1")
-        req_nivel_num = level_order.get(req_nivel, 0)
+        req_nivel_num = LANGUAGE_LEVELS.get(req_lang.get("nivel_minimo", "A1"), 0)
         
         # Buscar idioma en estudiante
-        for student_lang in student_langs:
-            student_idioma = student_lang.get("idioma", "").lower()
-            student_nivel = student_lang.get("nivel", "A1")
-            student_nivel_num = level_order.get(student_nivel, 0)
-            
-            if req_idioma == student_idioma and student_nivel_num >= req_nivel_num:
-                matches += 1
-                break
+        if student_levels.get(req_idioma, -1) >= req_nivel_num:
+            matches += 1
     
     return matches / len(required_langs)
 
@@ -188,23 +252,54 @@ def calculate_overall_match(desglose: MatchDesglose) -> float:
     """
     Calcular porcentaje total de matching
     
-    Pesos configurables según importancia
+    Pesos configurables según importancia (MATCH_WEIGHTS); mismo cálculo
+    vectorizado que run_matching_for_vacancy aplica a todos los candidatos
     """
-    weights = {
-        "habilidades_tecnicas": 0.30,    # 30%
-        "habilidades_blandas": 0.15,     # 15%
-        "idiomas": 0.15,                 # 15%
-        "experiencia": 0.15,             # 15%
-        "carrera": 0.15,                 # 15%
-        "semestre": 0.05,                # 5%
-        "modalidad": 0.05                # 5%
-    }
+    return float(score_matrix(desglose_matrix([desglose]))[0])
+
+
+def desglose_batch(vacancy: dict, students: List[dict]) -> np.ndarray:
+    """
+    Desgloses de todos los estudiantes contra una vacante: matriz (N, 7) en el
+    orden de DESGLOSE_FIELDS
     
-    total = 0.0
-    for field, weight in weights.items():
-        total += getattr(desglose, field) * weight
+    Los requisitos de la vacante se leen una sola vez y no se crea un
+    MatchDesglose por estudiante; sin acceso a la base de datos
+    """
+    tecnicas_requeridas = vacancy.get("habilidades_tecnicas_requeridas", [])
+    blandas_requeridas = vacancy.get("habilidades_blandas_requeridas", [])
+    idiomas_requeridos = vacancy.get("idiomas_requeridos", [])
+    experiencia_minima = vacancy.get("experiencia_minima", "Sin experiencia")
+    carrera_requerida = vacancy.get("carrera_requerida", [])
+    semestre_minimo = vacancy.get("semestre_minimo", 0)
+    modalidad = vacancy.get("modalidad", "")
+    
+    matrix = np.empty((len(students), len(DESGLOSE_FIELDS)), dtype=np.float64)
+    for i, student in enumerate(students):
+        # Mismo orden que DESGLOSE_FIELDS
+        matrix[i] = (
+            calculate_skills_match(student.get("habilidades_tecnicas", []), tecnicas_requeridas),
+            calculate_skills_match(student.get("habilidades_blandas", []), blandas_requeridas),
+            calculate_language_match(student.get("idiomas", []), idiomas_requeridos),
+            calculate_experience_match(student.get("experiencia_laboral", []), experiencia_minima),
+            calculate_career_match(student.get("carrera", ""), carrera_requerida),
+            calculate_semester_match(student.get("semestre", 0), semestre_minimo),
+            calculate_modality_match(student.get("modalidad_preferida", ""), modalidad)
+        )
     
-    return round(total * 100, 2)  # Convertir a porcentaje
+    return matrix
+
+
+def desglose_from_row(row) -> MatchDesglose:
+    """MatchDesglose desde una fila de desglose_batch (valores ya en rango 0-1)"""
+    return MatchDesglose.model_construct(**dict(zip(DESGLOSE_FIELDS, row)))
+
+
+def compute_desglose(vacancy: dict, student: dict) -> MatchDesglose:
+    """
+    Desglose de matching entre documentos ya cargados de vacante y estudiante
+    """
+    return desglose_from_row(desglose_batch(vacancy, [student])[0].tolist())
 
 
 async def perform_matching(vacancy_id: str, student_matricula: str) -> MatchDesglose:
@@ -225,51 +320,7 @@ async def perform_matching(vacancy_id: str, student_matricula: str) -> MatchDesg
             detail="Vacancy or student not found"
         )
     
-    # Calcular cada componente
-    habilidades_tecnicas = calculate_skills_match(
-        student.get("habilidades_tecnicas", []),
-        vacancy.get("habilidades_tecnicas_requeridas", [])
-    )
-    
-    habilidades_blandas = calculate_skills_match(
-        student.get("habilidades_blandas", []),
-        vacancy.get("habilidades_blandas_requeridas", [])
-    )
-    
-    idiomas = calculate_language_match(
-        student.get("idiomas", []),
-        vacancy.get("idiomas_requeridos", [])
-    )
-    
-    experiencia = calculate_experience_match(
-        student.get("experiencia_laboral", []),
-        vacancy.get("experiencia_minima", "Sin experiencia")
-    )
-    
-    carrera = calculate_career_match(
-        student.get("carrera", ""),
-        vacancy.get("carrera_requerida", [])
-    )
-    
-    semestre = calculate_semester_match(
-        student.get("semestre", 0),
-        vacancy.get("semestre_minimo", 0)
-    )
-    
-    modalidad = calculate_modality_match(
-        student.get("modalidad_preferida", ""),
-        vacancy.get("modalidad", "")
-    )
-    
-    return MatchDesglose(
-        habilidades_tecnicas=habilidades_tecnicas,
-        habilidades_blandas=habilidades_blandas,
-        idiomas=idiomas,
-        experiencia=experiencia,
-        carrera=carrera,
-        semestre=semestre,
-        modalidad=modalidad
-    )
+    return compute_desglose(vacancy, student)
 
 
 # ============= ENDPOINTS =============
@@ -353,29 +404,46 @@ async def run_matching_for_vacancy(
             "matches_found": 0
         }
     
-    # Realizar matching para cada estudiante
+    # Matrículas que ya tienen match con esta vacante (una sola consulta)
+    matched = set(await matches.distinct(
+        "student_matricula", {"vacancy_id": ObjectId(vacancy_id)}
+    ))
+    
+    # Estudiantes sin match previo
     matches_found = 0
-    matches_created = 0
+    candidates = [
+        student for student in student_list
+        if student.get("matricula") not in matched
+    ]
+    
+    # Desglose (N, 7) de todos los candidatos contra la vacante ya cargada
+    desgloses = desglose_batch(vacancy, candidates)
+    
+    # Puntuar todos los candidatos de una vez: (N, 7) @ pesos + coseno de embeddings
+    vac_emb = unpack_embedding(vacancy.get("vacancy_embedding") or b"")
+    packed_embeddings = {}
+    if vac_emb.size and candidates:
+        embeddings = await get_student_embeddings_collection()
+        async for doc in embeddings.find(
+            {"_id": {"$in": [student["_id"] for student in candidates]}},
+            {"embedding": 1}
+        ):
+            packed_embeddings[doc["_id"]] = doc["embedding"]
+    stu_embs = embedding_matrix(
+        [packed_embeddings.get(student["_id"]) for student in candidates], vac_emb.size
+    )
+    porcentajes, similitudes = score_batch(vac_emb, stu_embs, desgloses)
     
-    for student in student_list:
+    to_insert = []
+    for student, row, porcentaje, similitud in zip(
+        candidates, desgloses.tolist(), porcentajes.tolist(), similitudes.tolist()
+    ):
         matricula = student.get("matricula")
         
-        # Verificar si ya existe un match
-        existing_match = await matches.find_one({
-            "vacancy_id": ObjectId(vacancy_id),
-            "student_matricula": matricula
-        })
-        
-        if existing_match:
-            continue  # Ya existe, saltar
-        
-        # Calcular matching
-        desglose = await perform_matching(vacancy_id, matricula)
-        porcentaje = calculate_overall_match(desglose)
-        
         # Si cumple con el mínimo, crear match
         if porcentaje >= min_match_percentage:
             matches_found += 1
+            desglose = desglose_from_row(row)
             
             # Crear radar chart data
             radar_data = {
@@ -392,15 +460,28 @@ async def run_matching_for_vacancy(
                 "vacancy_id": ObjectId(vacancy_id),
                 "student_matricula": matricula,
                 "porcentaje_match": porcentaje,
-                "desglose": desglose.dict(),
+                "desglose_packed": pack_desglose(desglose),
                 "radar_chart_data": radar_data,
                 "fecha_match": datetime.utcnow(),
                 "visto_por_empresa": False,
-                "embedding_similarity": None  # Se puede agregar después con IA
+                "embedding_similarity": None if np.isnan(similitud) else round(similitud, 4),
+                "student_snapshot": student_snapshot(student)
             }
             
-            await matches.insert_one(match_doc)
-            matches_created += 1
+            to_insert.append(match_doc)
+    
+    # Guardar todos los matches en una sola escritura; si otra ejecución
+    # concurrente ya creó alguno, el índice único lo descarta y se siguen
+    # insertando los demás
+    matches_created = 0
+    if to_insert:
+        try:
+            result = await matches.insert_many(to_insert, ordered=False)
+            matches_created = len(result.inserted_ids)
+        except BulkWriteError as e:
+            if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+                raise
+            matches_created = e.details.get("nInserted", 0)
     
     # Actualizar contador en la vacante
     await vacancies.update_one(
@@ -466,46 +547,49 @@ async def get_matches_for_vacancy(
     
     match_list = await matches_coll.find(filters).sort("porcentaje_match", -1).skip(skip).limit(limit).to_list(length=limit)
     
+    # Marcar como vistos los matches de la página en una sola escritura
+    unseen_ids = [m["_id"] for m in match_list if not m.get("visto_por_empresa", False)]
+    if unseen_ids:
+        await matches_coll.update_many(
+            {"_id": {"$in": unseen_ids}},
+            {"$set": {
+                "visto_por_empresa": True,
+                "fecha_visto": datetime.utcnow()
+            }}
+        )
+    
+    # Matches creados antes del snapshot: consultar a sus estudiantes de una vez
+    legacy_matriculas = [
+        m["student_matricula"] for m in match_list if m.get("student_snapshot") is None
+    ]
+    students_by_matricula = {}
+    if legacy_matriculas:
+        async for student in students.find(
+            {"matricula": {"$in": legacy_matriculas}},
+            {field: 1 for field in SNAPSHOT_SOURCE_FIELDS | {"matricula"}}
+        ):
+            students_by_matricula[student["matricula"]] = student
+    
     # Construir respuesta con datos anónimos
     matches_response = []
     for match in match_list:
-        # Marcar como visto
-        if not match.get("visto_por_empresa", False):
-            await matches_coll.update_one(
-                {"_id": match["_id"]},
-                {"$set": {
-                    "visto_por_empresa": True,
-                    "fecha_visto": datetime.utcnow()
-                }}
-            )
-        
-        # Obtener datos anónimos del estudiante
-        student = await students.find_one({"matricula": match["student_matricula"]})
+        # Datos anónimos del estudiante: snapshot guardado en el match
+        snapshot = match.get("student_snapshot")
+        if snapshot is None:
+            student = students_by_matricula.get(match["student_matricula"])
+            if not student:
+                continue
+            snapshot = student_snapshot(student)
         
-        if student:
-            matches_response.append(MatchResponse(
-                _id=str(match["_id"]),
-                student_matricula=match["student_matricula"],
-                porcentaje_match=match["porcentaje_match"],
-                desglose=MatchDesglose(**match["desglose"]),
-                fecha_match=match["fecha_match"],
-                carrera=student.get("carrera", ""),
-                semestre=student.get("semestre", 0),
-                habilidades_tecnicas=student.get("habilidades_tecnicas", []),
-                habilidades_blandas=student.get("habilidades_blandas", []),
-                idiomas=student.get("idiomas", []),
-                tiene_experiencia=len(student.get("experiencia_laboral", [])) > 0,
-                modalidad_preferida=student.get("modalidad_preferida", ""),
-                radar_chart_data=match.get("radar_chart_data", {})
-            ))
+        matches_response.append(match_response(match, snapshot))
     
     total_matches = await matches_coll.count_documents(filters)
     
-    return MatchListResponse(
+    return MatchListResponse.model_construct(
         vacancy_id=vacancy_id,
         vacancy_titulo=vacancy.get("titulo", ""),
         total_matches=total_matches,
-        matches=matches_response
+        matches=tuple(matches_response)
     )
 
 
@@ -546,7 +630,7 @@ async def get_radar_chart_data(
         )
     
     # Preparar datos para gráfica
-    desglose = match["desglose"]
+    desglose = match_desglose(match)
     
     categories = [
         "Habilidades Técnicas",
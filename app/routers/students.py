@@ -3,6 +3,7 @@ Router de Estudiantes
 Endpoints para gestión de perfiles de estudiantes
 """
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Request
+from fastapi.concurrency import run_in_threadpool
 from typing import List, Optional
 from datetime import datetime
 from bson import ObjectId
@@ -19,15 +20,24 @@ from app.models.student import (
     Certificacion
 )
 from app.models.user import UserInDB
-from app.database import get_students_collection, get_users_collection
+from app.database import (
+    get_students_collection,
+    get_student_embeddings_collection,
+    get_users_collection,
+    get_matches_collection
+)
 from app.config import settings
 
 # Importar cuando tengamos el módulo de auth completo
 from app.routers.auth import get_current_user
+from app.routers.matching import SNAPSHOT_SOURCE_FIELDS, student_snapshot
 from app.limiter import limiter
 
 router = APIRouter()
 
+# Límite de subidas como str: slowapi lo parsea una sola vez al decorar
+UPLOAD_LIMIT = settings.upload_limit
+
 
 # ============= FUNCIONES AUXILIARES =============
 
@@ -36,7 +46,7 @@ def student_helper(student) -> dict:
     return {
         "_id": str(student["_id"]),
         "user_id": str(student["user_id"]),
-        **{k: v for k, v in student.items() if k not in ["_id", "user_id"]}
+        **{k: v for k, v in student.items() if k not in ["_id", "user_id", "profile_embedding"]}
     }
 
 
@@ -182,8 +192,12 @@ async def update_my_profile(
     """
     students = await get_students_collection()
     
-    # Obtener solo los campos que no son None
-    update_data = {k: v for k, v in profile_update.dict().items() if v is not None}
+    # Obtener solo los campos que no son None; las listas ya validadas de
+    # experiencia/proyectos/certificaciones se vuelcan en una sola llamada a
+    # pydantic-core (exclude_none no sirve: quitaría los None anidados)
+    update_data = profile_update.model_dump(
+        exclude={k for k, v in profile_update if v is None}
+    )
     
     if not update_data:
         raise HTTPException(
@@ -209,6 +223,14 @@ async def update_my_profile(
         {"$set": {"perfil_completo": perfil_completo}}
     )
     
+    # Mantener al día el snapshot guardado en sus matches
+    if SNAPSHOT_SOURCE_FIELDS.intersection(update_data):
+        matches = await get_matches_collection()
+        await matches.update_many(
+            {"student_matricula": updated_student["matricula"]},
+            {"$set": {"student_snapshot": student_snapshot(updated_student)}}
+        )
+    
     return {
         "message": "Profile updated successfully",
         "perfil_completo": perfil_completo,
@@ -217,7 +239,7 @@ async def update_my_profile(
 
 
 @router.post("/profile/cv", response_model=dict)
-@limiter.limit(lambda: settings.upload_limit)
+@limiter.limit(UPLOAD_LIMIT)
 async def upload_cv(
     request: Request,
     cv: UploadFile = File(...),
@@ -320,11 +342,21 @@ async def add_experiencia(
     await students.update_one(
         {"_id": current_student.id},
         {
-            "$push": {"experiencia_laboral": experiencia.dict()},
+            "$push": {"experiencia_laboral": experiencia.model_dump()},
             "$set": {"updated_at": datetime.utcnow()}
         }
     )
     
+    # El snapshot de sus matches ahora tiene experiencia
+    matches = await get_matches_collection()
+    await matches.update_many(
+        {
+            "student_matricula": current_student.matricula,
+            "student_snapshot.tiene_experiencia": False
+        },
+        {"$set": {"student_snapshot.tiene_experiencia": True}}
+    )
+    
     return {"message": "Work experience added successfully"}
 
 
@@ -341,7 +373,7 @@ async def add_proyecto(
     await students.update_one(
         {"_id": current_student.id},
         {
-            "$push": {"proyectos": proyecto.dict()},
+            "$push": {"proyectos": proyecto.model_dump()},
             "$set": {"updated_at": datetime.utcnow()}
         }
     )
@@ -362,7 +394,7 @@ async def add_certificacion(
     await students.update_one(
         {"_id": current_student.id},
         {
-            "$push": {"certificaciones": certificacion.dict()},
+            "$push": {"certificaciones": certificacion.model_dump()},
             "$set": {"updated_at": datetime.utcnow()}
         }
     )
@@ -456,7 +488,7 @@ async def delete_my_profile(
     from app.routers.auth import verify_password
     
     # Verificar contraseña
-    if not verify_password(password, current_user.hashed_password):
+    if not await run_in_threadpool(verify_password, password, current_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect password"
@@ -470,8 +502,12 @@ async def delete_my_profile(
         if os.path.exists(cv_path):
             os.remove(cv_path)
     
-    # Eliminar perfil
+    # Eliminar perfil, su embedding y sus matches (guardan un snapshot de sus datos)
     await students.delete_one({"_id": current_student.id})
+    embeddings = await get_student_embeddings_collection()
+    await embeddings.delete_one({"_id": current_student.id})
+    matches = await get_matches_collection()
+    await matches.delete_many({"student_matricula": current_student.matricula})
     
     return {"message": "Student profile deleted successfully"}
 
@@ -33,7 +33,15 @@ def vacancy_helper(vacancy) -> dict:
     return {
         "_id": str(vacancy["_id"]),
         "company_id": str(vacancy["company_id"]),
-        **{k: v for k, v in vacancy.items() if k not in ["_id", "company_id"]}
+        **{k: v for k, v in vacancy.items() if k not in ["_id", "company_id", "vacancy_embedding"]}
+    }
+
+
+def vacancy_display(vacancy) -> dict:
+    """Campos de listas ya unidos como texto para mostrar en el frontend"""
+    return {
+        "tech": ", ".join(vacancy.get("habilidades_tecnicas_requeridas") or []),
+        "soft": ", ".join(vacancy.get("habilidades_blandas_requeridas") or [])
     }
 
 
@@ -125,7 +133,10 @@ async def get_my_vacancies(
     
     vacancy_list = await vacancies.find(filters).skip(skip).limit(limit).to_list(length=limit)
     
-    return [vacancy_helper(v) for v in vacancy_list]
+    return [
+        {**vacancy_helper(v), "display": vacancy_display(v)}
+        for v in vacancy_list
+    ]
 
 
 @router.get("/{vacancy_id}", response_model=dict)
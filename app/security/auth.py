@@ -3,15 +3,18 @@ Helpers de autenticación (hashing, tokens y dependencia get_current_user).
 Separamos esta lógica desde los routers para mejorar organización y testabilidad.
 """
 from datetime import datetime, timedelta
-from typing import Optional
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
 import hashlib
 import logging
+import time
 import uuid
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from passlib.context import CryptContext
-from jose import JWTError, jwt
+import jwt
+from jwt import InvalidTokenError as JWTError
 
 from app.config import settings
 from app.database import get_users_collection
@@ -19,10 +22,15 @@ from app.models.user import UserInDB, TokenData
 
 logger = logging.getLogger(__name__)
 
-# Configuración específica de bcrypt
+# Argon2id para hashes nuevos; bcrypt queda solo para verificar los existentes
+# (deprecated="auto" los marca para re-hashear en el siguiente login)
 pwd_context = CryptContext(
-    schemes=["bcrypt"],
-    default="bcrypt",
+    schemes=["argon2", "bcrypt"],
+    default="argon2",
+    argon2__type="ID",
+    argon2__time_cost=3,
+    argon2__memory_cost=12288,
+    argon2__parallelism=1,
     bcrypt__default_rounds=12,
     deprecated="auto"
 )
@@ -32,13 +40,20 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verificar contraseña: bcrypt(password[:72])"""
-    return pwd_context.verify(plain_password[:72], hashed_password)
+    """Verificar contraseña (los hashes bcrypt heredados usan password[:72])"""
+    if pwd_context.identify(hashed_password) == "bcrypt":
+        plain_password = plain_password[:72]
+    return pwd_context.verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    """Generar hash de contraseña: bcrypt(password[:72])"""
-    return pwd_context.hash(password[:72])
+    """Generar hash de contraseña con Argon2id"""
+    return pwd_context.hash(password)
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True si el hash es bcrypt o Argon2 con parámetros anteriores"""
+    return pwd_context.needs_update(hashed_password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -68,6 +83,35 @@ def create_refresh_token(data: dict) -> str:
     return encoded_jwt, jti
 
 
+# Payloads de refresh tokens ya verificados: token -> (exp, payload).
+# Solo guarda tokens válidos y cada entrada vence con el exp del propio token;
+# la revocación se sigue comprobando en refresh_tokens.
+_TOKEN_CACHE_MAX = 1024
+_token_cache: Dict[str, Tuple[float, dict]] = {}
+
+
+def decode_token_cached(token: str) -> dict:
+    """jwt.decode con caché hasta el exp del token (lanza JWTError si es inválido)"""
+    now = time.time()
+    cached = _token_cache.get(token)
+    if cached is not None:
+        if cached[0] > now:
+            return cached[1]
+        del _token_cache[token]
+
+    payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+    exp = payload.get("exp")
+    if exp is not None:
+        if len(_token_cache) >= _TOKEN_CACHE_MAX:
+            # Descartar vencidos; si sigue lleno, empezar de cero
+            for key in [k for k, (e, _) in _token_cache.items() if e <= now]:
+                del _token_cache[key]
+            if len(_token_cache) >= _TOKEN_CACHE_MAX:
+                _token_cache.clear()
+        _token_cache[token] = (float(exp), payload)
+    return payload
+
+
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserInDB:
     """Dependencia para obtener el usuario actual desde el token"""
     credentials_exception = HTTPException(
@@ -93,3 +137,26 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserInDB:
 
     # Normalizar a modelo pydantic
     return UserInDB(**user)
+
+
+# Texto del 403 por rol requerido
+_ROLE_LABELS = {"admin": "admins", "empresa": "company users", "estudiante": "students"}
+
+
+@lru_cache(maxsize=None)
+def require_role(role: str):
+    """
+    Dependencia que exige un rol; devuelve el usuario actual
+    
+    Cacheada por rol: la misma función para cada require_role("admin"), así
+    FastAPI la resuelve una vez por petición aunque varias dependencias la usen
+    """
+    async def dependency(current_user: UserInDB = Depends(get_current_user)) -> UserInDB:
+        if current_user.role != role:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Only {_ROLE_LABELS.get(role, role)} can access this endpoint"
+            )
+        return current_user
+    
+    return dependency
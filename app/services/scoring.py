@@ -0,0 +1,55 @@
+"""
+Puntuación por lotes de candidatos
+Similitud coseno de embeddings y porcentaje ponderado en operaciones de NumPy
+"""
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.matching import WEIGHT_VECTOR, score_matrix
+
+# Formato de embeddings en MongoDB: float32 little-endian empaquetado
+EMBEDDING_DTYPE = np.dtype("<f4")
+
+
+def pack_embedding(vector) -> bytes:
+    """Empaquetar un embedding como bytes float32 para guardarlo en MongoDB"""
+    return np.asarray(vector, dtype=EMBEDDING_DTYPE).tobytes()
+
+
+def unpack_embedding(data: bytes) -> np.ndarray:
+    """Leer un embedding empaquetado sin copiar el buffer"""
+    return np.frombuffer(data, dtype=EMBEDDING_DTYPE)
+
+
+def embedding_matrix(packed: Sequence[Optional[bytes]], dim: int) -> np.ndarray:
+    """Apilar embeddings en una matriz (N, dim); fila de ceros si falta o no coincide"""
+    matrix = np.zeros((len(packed), dim), dtype=EMBEDDING_DTYPE)
+    for i, data in enumerate(packed):
+        if data:
+            vector = unpack_embedding(data)
+            if vector.size == dim:
+                matrix[i] = vector
+    return matrix
+
+
+def score_batch(
+    vac_emb: np.ndarray,
+    stu_embs: np.ndarray,
+    desgloses: np.ndarray,
+    weights: np.ndarray = WEIGHT_VECTOR
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Porcentaje de matching y similitud coseno de todos los candidatos
+
+    Devuelve (porcentajes, similitudes); la similitud es NaN para
+    estudiantes sin embedding
+    """
+    porcentajes = score_matrix(desgloses, weights)
+
+    norms = np.linalg.norm(stu_embs, axis=1) * np.linalg.norm(vac_emb)
+    dots = stu_embs @ vac_emb
+    with np.errstate(divide="ignore", invalid="ignore"):
+        similitudes = np.where(norms > 0, dots / norms, np.nan)
+
+    return porcentajes, similitudes
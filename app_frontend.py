@@ -1,10 +1,20 @@
 import streamlit as st
 import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import plotly.graph_objects as go
 
 BASE_URL = "https://pp-vinculacion.onrender.com/"  # Tu backend local
 
+# Métricas del desglose que se muestran por candidato (etiqueta, campo)
+_METRIC_LABELS = (
+    ("💻 Técnicas", "habilidades_tecnicas"),
+    ("🤝 Blandas", "habilidades_blandas"),
+    ("🌐 Idiomas", "idiomas"),
+    ("📚 Carrera", "carrera"),
+)
+
 st.set_page_config(page_title="Plataforma de Vinculación TEVO", layout="wide")
 
 # Inicializar token en sesión
@@ -73,6 +83,167 @@ def create_radar_chart(radar_data):
     return fig
 
 
+# ========================
+# Consultas a la API
+# ========================
+
+MATCHES_PAGE_SIZE = 50
+
+
+@st.cache_resource
+def get_session_store():
+    """Sesiones HTTP por hilo, compartidas entre reruns (keep-alive)"""
+    return threading.local()
+
+
+def get_http_session(store=None):
+    """
+    Sesión HTTP del hilo actual (requests.Session no es thread-safe)
+    
+    Desde hilos del pool hay que pasar `store` obtenido en el hilo del script:
+    ahí no hay ScriptRunContext para llamar funciones de st.*
+    """
+    if store is None:
+        store = get_session_store()
+    session = getattr(store, "session", None)
+    if session is None:
+        session = store.session = requests.Session()
+    return session
+
+
+def session_get(store, url, **kwargs):
+    """GET con la sesión del hilo actual (apto para ejecutarse en el pool)"""
+    return get_http_session(store).get(url, **kwargs)
+
+
+@st.cache_resource
+def get_fetch_pool():
+    """Pool de hilos para lanzar en paralelo consultas independientes"""
+    return ThreadPoolExecutor(max_workers=4)
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def fetch_vacancy_matches(token, vacancy_id, min_percentage, skip):
+    """Obtener una página de candidatos ya filtrada por el backend"""
+    res = get_http_session().get(
+        f"{BASE_URL}/api/matching/vacancy/{vacancy_id}/matches",
+        headers={"Authorization": f"Bearer {token}"},
+        params={"min_percentage": min_percentage, "skip": skip, "limit": MATCHES_PAGE_SIZE}
+    )
+    return res.status_code, res.json() if res.status_code == 200 else None
+
+
+@st.fragment
+def render_vacancy_card(v, headers):
+    """Tarjeta de una vacante; sus botones solo re-ejecutan este fragmento"""
+    vacancy_id = v.get('_id') or v.get('id')
+    
+    with st.expander(f"📌 {v.get('titulo', 'Sin título')} - {v.get('num_candidatos_matched', 0)} candidatos"):
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            st.write(f"**📍 Ubicación:** {v.get('ubicacion_ciudad', 'N/A')}, {v.get('ubicacion_estado', 'N/A')}")
+            st.write(f"**💼 Tipo:** {v.get('tipo_contrato', 'N/A')}")
+            st.write(f"**🏢 Modalidad:** {v.get('modalidad', 'N/A')}")
+        
+        with col2:
+            st.write(f"**💰 Salario:** ${v.get('salario_minimo', 0):,} - ${v.get('salario_maximo', 0):,}")
+            st.write(f"**👥 Vacantes:** {v.get('num_vacantes', 1)}")
+            st.write(f"**📅 Publicada:** {v.get('fecha_publicacion', 'N/A')[:10]}")
+        
+        with col3:
+            estado = v.get('estado', 'activa')
+            if estado == 'activa':
+                st.success("✅ Activa")
+            elif estado == 'pausada':
+                st.warning("⏸️ Pausada")
+            else:
+                st.error("❌ Cerrada")
+            
+            st.write(f"**🎯 Candidatos:** {v.get('num_candidatos_matched', 0)}")
+        
+        st.write("---")
+        st.write(f"**📝 Descripción:** {v.get('descripcion', 'N/A')}")
+        
+        # Listas ya unidas por el backend (/my-vacancies)
+        display = v.get('display', {})
+        
+        if display.get('tech'):
+            st.write("**💻 Habilidades Técnicas:**")
+            st.write(display['tech'])
+        
+        if display.get('soft'):
+            st.write("**🤝 Habilidades Blandas:**")
+            st.write(display['soft'])
+        
+        if idiomas := v.get('idiomas_requeridos'):
+            st.markdown("**🌐 Idiomas:**\n" + "\n".join(
+                f"- {i.get('idioma', 'N/A')}: {i.get('nivel_minimo', 'N/A')}" for i in idiomas
+            ))
+        
+        st.write("---")
+        
+        # Botones de acción
+        col_btn1, col_btn2, col_btn3, col_btn4 = st.columns(4)
+        
+        with col_btn1:
+            if st.button(f"🔍 Ver Candidatos", key=f"ver_{vacancy_id}"):
+                st.session_state['selected_vacancy'] = vacancy_id
+                st.session_state['match_offset'] = 0
+                st.rerun()
+        
+        with col_btn2:
+            if st.button(f"🤖 Ejecutar Matching", key=f"match_{vacancy_id}"):
+                with st.spinner("Ejecutando matching..."):
+                    match_res = requests.post(
+                        f"{BASE_URL}/api/matching/vacancy/{vacancy_id}/run",
+                        headers=headers,
+                        params={"min_match_percentage": 70.0}
+                    )
+                    if match_res.status_code == 200:
+                        result = match_res.json()
+                        st.success(f"✅ Matching completado: {result.get('matches_created', 0)} nuevos candidatos encontrados")
+                        fetch_vacancy_matches.clear()
+                        st.rerun()
+                    else:
+                        st.error(f"❌ Error: {match_res.json()}")
+        
+        with col_btn3:
+            if v.get('estado') == 'activa':
+                if st.button(f"⏸️ Pausar", key=f"pause_{vacancy_id}"):
+                    pause_res = requests.put(
+                        f"{BASE_URL}/api/vacancies/{vacancy_id}/status",
+                        headers=headers,
+                        json={"estado": "pausada"}
+                    )
+                    if pause_res.status_code == 200:
+                        # Solo cambia esta tarjeta: basta con re-ejecutar el fragmento
+                        v['estado'] = "pausada"
+                        st.rerun(scope="fragment")
+            else:
+                if st.button(f"▶️ Activar", key=f"activate_{vacancy_id}"):
+                    activate_res = requests.put(
+                        f"{BASE_URL}/api/vacancies/{vacancy_id}/status",
+                        headers=headers,
+                        json={"estado": "activa"}
+                    )
+                    if activate_res.status_code == 200:
+                        v['estado'] = "activa"
+                        st.rerun(scope="fragment")
+        
+        with col_btn4:
+            if st.button(f"🗑️ Eliminar", key=f"delete_{vacancy_id}"):
+                delete_res = requests.delete(
+                    f"{BASE_URL}/api/vacancies/{vacancy_id}",
+                    headers=headers
+                )
+                if delete_res.status_code == 200:
+                    st.success("✅ Vacante eliminada")
+                    st.rerun()
+                else:
+                    st.error("❌ Error al eliminar")
+
+
 # ========================
 # Barra lateral
 # ========================
@@ -1811,9 +1982,23 @@ elif choice == "Mis Vacantes":
         st.warning("⚠️ Primero inicia sesión")
     else:
         headers = {"Authorization": f"Bearer {token}"}
+        pool = get_fetch_pool()
         
-        # Obtener vacantes de la empresa
-        res = requests.get(f"{BASE_URL}/api/vacancies/my-vacancies", headers=headers)
+        # Obtener vacantes de la empresa en el pool y, mientras tanto, los
+        # candidatos de la vacante seleccionada en el hilo del script (la
+        # caché de st.cache_data necesita el ScriptRunContext)
+        vacancies_future = pool.submit(
+            session_get, get_session_store(), f"{BASE_URL}/api/vacancies/my-vacancies", headers=headers
+        )
+        matches_result = None
+        if st.session_state.get('selected_vacancy'):
+            matches_result = fetch_vacancy_matches(
+                token,
+                st.session_state['selected_vacancy'],
+                st.session_state.get('match_min_percentage', 70),
+                st.session_state.get('match_offset', 0)
+            )
+        res = vacancies_future.result()
         
         if res.status_code == 200:
             vacantes = res.json()
@@ -1826,106 +2011,7 @@ elif choice == "Mis Vacantes":
                 
                 with tab1:
                     for v in vacantes:
-                        vacancy_id = v.get('_id') or v.get('id')
-                        
-                        with st.expander(f"📌 {v.get('titulo', 'Sin título')} - {v.get('num_candidatos_matched', 0)} candidatos"):
-                            col1, col2, col3 = st.columns(3)
-                            
-                            with col1:
-                                st.write(f"**📍 Ubicación:** {v.get('ubicacion_ciudad', 'N/A')}, {v.get('ubicacion_estado', 'N/A')}")
-                                st.write(f"**💼 Tipo:** {v.get('tipo_contrato', 'N/A')}")
-                                st.write(f"**🏢 Modalidad:** {v.get('modalidad', 'N/A')}")
-                            
-                            with col2:
-                                st.write(f"**💰 Salario:** ${v.get('salario_minimo', 0):,} - ${v.get('salario_maximo', 0):,}")
-                                st.write(f"**👥 Vacantes:** {v.get('num_vacantes', 1)}")
-                                st.write(f"**📅 Publicada:** {v.get('fecha_publicacion', 'N/A')[:10]}")
-                            
-                            with col3:
-                                estado = v.get('estado', 'activa')
-                                if estado == 'activa':
-                                    st.success("✅ Activa")
-                                elif estado == 'pausada':
-                                    st.warning("⏸️ Pausada")
-                                else:
-                                    st.error("❌ Cerrada")
-                                
-                                st.write(f"**🎯 Candidatos:** {v.get('num_candidatos_matched', 0)}")
-                            
-                            st.write("---")
-                            st.write(f"**📝 Descripción:** {v.get('descripcion', 'N/A')}")
-                            
-                            if v.get('habilidades_tecnicas_requeridas'):
-                                st.write("**💻 Habilidades Técnicas:**")
-                                st.write(", ".join(v['habilidades_tecnicas_requeridas']))
-                            
-                            if v.get('habilidades_blandas_requeridas'):
-                                st.write("**🤝 Habilidades Blandas:**")
-                                st.write(", ".join(v['habilidades_blandas_requeridas']))
-                            
-                            if v.get('idiomas_requeridos'):
-                                st.write("**🌐 Idiomas:**")
-                                for idioma in v['idiomas_requeridos']:
-                                    st.write(f"- {idioma.get('idioma', 'N/A')}: {idioma.get('nivel_minimo', 'N/A')}")
-                            
-                            st.write("---")
-                            
-                            # Botones de acción
-                            col_btn1, col_btn2, col_btn3, col_btn4 = st.columns(4)
-                            
-                            with col_btn1:
-                                if st.button(f"🔍 Ver Candidatos", key=f"ver_{vacancy_id}"):
-                                    st.session_state['selected_vacancy'] = vacancy_id
-                                    st.rerun()
-                            
-                            with col_btn2:
-                                if st.button(f"🤖 Ejecutar Matching", key=f"match_{vacancy_id}"):
-                                    with st.spinner("Ejecutando matching..."):
-                                        match_res = requests.post(
-                                            f"{BASE_URL}/api/matching/vacancy/{vacancy_id}/run",
-                                            headers=headers,
-                                            params={"min_match_percentage": 70.0}
-                                        )
-                                        if match_res.status_code == 200:
-                                            result = match_res.json()
-                                            st.success(f"✅ Matching completado: {result.get('matches_created', 0)} nuevos candidatos encontrados")
-                                            st.rerun()
-                                        else:
-                                            st.error(f"❌ Error: {match_res.json()}")
-                            
-                            with col_btn3:
-                                if v.get('estado') == 'activa':
-                                    if st.button(f"⏸️ Pausar", key=f"pause_{vacancy_id}"):
-                                        pause_res = requests.put(
-                                            f"{BASE_URL}/api/vacancies/{vacancy_id}/status",
-                                            headers=headers,
-                                            json={"estado": "pausada"}
-                                        )
-                                        if pause_res.status_code == 200:
-                                            st.success("✅ Vacante pausada")
-                                            st.rerun()
-                                else:
-                                    if st.button(f"▶️ Activar", key=f"activate_{vacancy_id}"):
-                                        activate_res = requests.put(
-                                            f"{BASE_URL}/api/vacancies/{vacancy_id}/status",
-                                            headers=headers,
-                                            json={"estado": "activa"}
-                                        )
-                                        if activate_res.status_code == 200:
-                                            st.success("✅ Vacante activada")
-                                            st.rerun()
-                            
-                            with col_btn4:
-                                if st.button(f"🗑️ Eliminar", key=f"delete_{vacancy_id}"):
-                                    delete_res = requests.delete(
-                                        f"{BASE_URL}/api/vacancies/{vacancy_id}",
-                                        headers=headers
-                                    )
-                                    if delete_res.status_code == 200:
-                                        st.success("✅ Vacante eliminada")
-                                        st.rerun()
-                                    else:
-                                        st.error("❌ Error al eliminar")
+                        render_vacancy_card(v, headers)
                 
                 with tab2:
                     st.subheader("➕ Crear Nueva Vacante")
@@ -2025,28 +2111,25 @@ elif choice == "Mis Vacantes":
                     st.markdown("---")
                     st.subheader(f"👥 Candidatos para la vacante")
                     
-                    vacancy_id = st.session_state['selected_vacancy']
+                    # Filtro por porcentaje (se aplica en el backend); su valor ya
+                    # se usó arriba al lanzar la consulta de candidatos
+                    st.slider("Porcentaje mínimo de compatibilidad", 0, 100, 70, key="match_min_percentage")
+                    match_offset = st.session_state.get('match_offset', 0)
                     
-                    # Obtener matches
-                    matches_res = requests.get(
-                        f"{BASE_URL}/api/matching/vacancy/{vacancy_id}/matches",
-                        headers=headers,
-                        params={"min_percentage": 0}
-                    )
+                    # Obtener matches (solo la página visible)
+                    matches_status, matches_data = matches_result
                     
-                    if matches_res.status_code == 200:
-                        matches_data = matches_res.json()
+                    if matches_status == 200:
                         matches = matches_data.get('matches', [])
+                        total_matches = matches_data.get('total_matches', len(matches))
                         
                         if matches:
-                            st.info(f"📊 Total de candidatos: {len(matches)}")
-                            
-                            # Filtro por porcentaje
-                            min_percentage = st.slider("Porcentaje mínimo de compatibilidad", 0, 100, 70)
-                            
-                            matches_filtered = [m for m in matches if m.get('porcentaje_match', 0) >= min_percentage]
+                            st.info(
+                                f"📊 Total de candidatos: {total_matches} "
+                                f"(mostrando {match_offset + 1}-{match_offset + len(matches)})"
+                            )
                             
-                            for match in matches_filtered:
+                            for match in matches:
                                 with st.expander(f"🎯 {match.get('porcentaje_match', 0):.1f}% - {match.get('student_matricula', 'N/A')} - {match.get('carrera', 'N/A')}"):
                                     col1, col2 = st.columns(2)
                                     
@@ -2065,16 +2148,22 @@ elif choice == "Mis Vacantes":
                                     st.write("**📊 Desglose de Compatibilidad:**")
                                     desglose = match.get('desglose', {})
                                     
-                                    cols = st.columns(4)
-                                    metrics = [
-                                        ("💻 Técnicas", desglose.get('habilidades_tecnicas', 0) * 100),
-                                        ("🤝 Blandas", desglose.get('habilidades_blandas', 0) * 100),
-                                        ("🌐 Idiomas", desglose.get('idiomas', 0) * 100),
-                                        ("📚 Carrera", desglose.get('carrera', 0) * 100)
-                                    ]
-                                    
-                                    for col, (label, value) in zip(cols, metrics):
-                                        col.metric(label, f"{value:.0f}%")
+                                    for (label, key), col in zip(_METRIC_LABELS, st.columns(len(_METRIC_LABELS))):
+                                        col.metric(label, f"{desglose.get(key, 0) * 100:.0f}%")
+                            
+                            # Paginación
+                            col_prev, col_next = st.columns(2)
+                            with col_prev:
+                                if match_offset > 0 and st.button("⬅️ Anteriores", key="matches_prev"):
+                                    st.session_state['match_offset'] = max(0, match_offset - MATCHES_PAGE_SIZE)
+                                    st.rerun()
+                            with col_next:
+                                if match_offset + len(matches) < total_matches and st.button("Siguientes ➡️", key="matches_next"):
+                                    st.session_state['match_offset'] = match_offset + MATCHES_PAGE_SIZE
+                                    st.rerun()
+                        elif match_offset > 0:
+                            st.session_state['match_offset'] = 0
+                            st.rerun()
                         else:
                             st.warning("⚠️ No hay candidatos para esta vacante. Ejecuta el matching para encontrar candidatos.")
                     else:
@@ -2082,6 +2171,7 @@ elif choice == "Mis Vacantes":
                     
                     if st.button("⬅️ Volver a lista de vacantes"):
                         del st.session_state['selected_vacancy']
+                        st.session_state.pop('match_offset', None)
                         st.rerun()
             
             else:
@@ -0,0 +1,9 @@
+"""
+Configuración común de pytest
+"""
+import os
+
+# Valores mínimos para importar app.config sin .env ni MongoDB
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("ENCRYPTION_KEY", "test-encryption-key")
+os.environ.setdefault("TESTING", "true")
@@ -0,0 +1,74 @@
+"""
+Pruebas de company_response (CompanyResponse desde documentos de MongoDB)
+"""
+from datetime import datetime
+
+from bson import ObjectId
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.models.company import CompanyResponse
+from app.routers.companies import company_response
+
+
+def stored_company(**overrides) -> dict:
+    """Documento de empresa tal como lo guarda create_company_profile"""
+    doc = {
+        "_id": ObjectId(),
+        "user_id": ObjectId(),
+        "nombre_empresa": "Tech Solutions SA",
+        "rfc": "TSO123456ABC",
+        "giro": "Tecnología",
+        "tamano": "Mediana",
+        "email_contacto": "rh@techsolutions.com",
+        "telefono": "5555551234",
+        "direccion": "Av. Principal 123",
+        "ciudad": "Ciudad de México",
+        "estado": "CDMX",
+        "codigo_postal": "01000",
+        "descripcion": "Empresa líder en desarrollo de software",
+        "beneficios": ["Seguro médico"],
+        "verificada": False,
+        "fecha_registro": datetime(2025, 10, 1, 8, 0),
+        "fecha_actualizacion": datetime(2025, 10, 16, 10, 30)
+    }
+    doc.update(overrides)
+    return doc
+
+
+def serve(company: dict) -> dict:
+    """Salida JSON de una ruta con response_model=CompanyResponse"""
+    app = FastAPI()
+    
+    @app.get("/company", response_model=CompanyResponse)
+    async def company_route():
+        return company_response(company)
+    
+    return TestClient(app).get("/company").json()
+
+
+def test_company_response_maps_stored_dates():
+    company = stored_company()
+    expected = CompanyResponse.model_validate({
+        **company,
+        "_id": str(company["_id"]),
+        "created_at": company["fecha_registro"],
+        "updated_at": company["fecha_actualizacion"]
+    }).model_dump(mode="json", by_alias=True)
+    
+    body = serve(company)
+    
+    assert body["created_at"] == "2025-10-01T08:00:00"
+    assert body["updated_at"] == "2025-10-16T10:30:00"
+    # Misma salida que validando el documento contra el modelo
+    assert body == expected
+
+
+def test_company_response_without_fecha_registro_uses_id_time():
+    company = stored_company()
+    del company["fecha_registro"]
+    oid = company["_id"]
+    
+    body = serve(company)
+    
+    assert datetime.fromisoformat(body["created_at"]) == oid.generation_time
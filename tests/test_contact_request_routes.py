@@ -0,0 +1,27 @@
+"""
+Orden de dependencias en las rutas de solicitudes de contacto
+"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routers.contact_requests import router
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("method, path, body", [
+    ("get", "/student-contact/no-es-un-id", None),
+    ("put", "/admin/no-es-un-id/review", {"estado": "aprobada"}),
+    ("delete", "/admin/no-es-un-id", None),
+])
+def test_invalid_id_without_token_is_unauthorized(client, method, path, body):
+    # La autenticación responde antes que la validación del id (no 400)
+    kwargs = {"json": body} if body is not None else {}
+    response = getattr(client, method)(path, **kwargs)
+    assert response.status_code == 401
@@ -0,0 +1,125 @@
+"""
+Pruebas de los modelos de match
+"""
+from datetime import datetime
+
+from bson import ObjectId
+
+from app.models.match import (
+    MatchDesglose,
+    MatchInDB,
+    MatchResponse,
+    StudentSnapshot,
+    pack_desglose,
+)
+from app.routers.matching import match_desglose, student_snapshot
+
+
+DESGLOSE = MatchDesglose(
+    habilidades_tecnicas=0.5,
+    habilidades_blandas=1.0,
+    idiomas=1.0,
+    experiencia=0.25,
+    carrera=1.0,
+    semestre=0.8,
+    modalidad=0.9
+)
+
+
+def stored_match(student: dict) -> dict:
+    """Documento de match tal como lo guarda run_matching_for_vacancy"""
+    return {
+        "_id": ObjectId(),
+        "vacancy_id": ObjectId(),
+        "student_matricula": student["matricula"],
+        "porcentaje_match": 73.5,
+        "desglose_packed": pack_desglose(DESGLOSE),
+        "radar_chart_data": {"Idiomas": 100.0},
+        "fecha_match": datetime(2025, 10, 16, 10, 30),
+        "visto_por_empresa": False,
+        "embedding_similarity": None,
+        "student_snapshot": student_snapshot(student)
+    }
+
+
+def test_snapshot_round_trips_through_match_response():
+    student = {
+        "matricula": "A01234567",
+        "carrera": "Ingeniería en Sistemas",
+        "semestre": 8,
+        "habilidades_tecnicas": ["Python"],
+        "habilidades_blandas": ["Comunicación"],
+        "idiomas": [
+            {"idioma": "Inglés", "nivel": "B2", "porcentaje": "80%"},
+            {"idioma": "Francés", "nivel": "A2"}  # Registro antiguo sin porcentaje
+        ],
+        "experiencia_laboral": [{"empresa": "X"}],
+        "modalidad_preferida": "Híbrido"
+    }
+    match = stored_match(student)
+    
+    # El snapshot guardado es válido para el modelo de base de datos
+    in_db = MatchInDB.model_validate(match)
+    assert in_db.student_snapshot == StudentSnapshot.model_validate(match["student_snapshot"])
+    
+    # Y con la forma de MatchResponse que arma get_matches_for_vacancy
+    response = MatchResponse.model_validate({
+        "_id": str(match["_id"]),
+        "student_matricula": match["student_matricula"],
+        "porcentaje_match": match["porcentaje_match"],
+        "desglose": match_desglose(match),
+        "fecha_match": match["fecha_match"],
+        **match["student_snapshot"],
+        "radar_chart_data": match["radar_chart_data"]
+    })
+    
+    data = response.model_dump(mode="json", by_alias=True)
+    assert data["idiomas"] == [
+        {"idioma": "Inglés", "nivel": "B2", "porcentaje": "80%"},
+        {"idioma": "Francés", "nivel": "A2", "porcentaje": None}
+    ]
+    assert data["tiene_experiencia"] is True
+    assert data["desglose"]["semestre"] == 0.8
+
+
+def test_match_list_response_serializes_constructed_matches():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    
+    from app.models.match import MatchListResponse
+    from app.routers.matching import match_response
+    
+    student = {
+        "matricula": "A01234567",
+        "carrera": "Ingeniería en Sistemas",
+        "semestre": 8,
+        "idiomas": [{"idioma": "Francés", "nivel": "A2"}]
+    }
+    match = stored_match(student)
+    
+    app = FastAPI()
+    
+    @app.get("/matches", response_model=MatchListResponse)
+    async def matches():
+        return MatchListResponse.model_construct(
+            vacancy_id=str(match["vacancy_id"]),
+            vacancy_titulo="Vacante",
+            total_matches=1,
+            matches=(match_response(match, match["student_snapshot"]),)
+        )
+    
+    body = TestClient(app).get("/matches").json()
+    item = body["matches"][0]
+    
+    # Misma salida que validando el documento contra el modelo
+    expected = MatchResponse.model_validate({
+        "_id": str(match["_id"]),
+        "student_matricula": match["student_matricula"],
+        "porcentaje_match": match["porcentaje_match"],
+        "desglose": match_desglose(match),
+        "fecha_match": match["fecha_match"],
+        **match["student_snapshot"],
+        "radar_chart_data": match["radar_chart_data"]
+    }).model_dump(mode="json", by_alias=True)
+    assert item == expected
+    assert item["idiomas"] == [{"idioma": "Francés", "nivel": "A2", "porcentaje": None}]
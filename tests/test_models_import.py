@@ -0,0 +1,17 @@
+"""
+Los modelos exportados se construyen completos al importarlos
+"""
+from pydantic import BaseModel
+
+import app.models as models
+
+
+def test_exported_models_are_complete():
+    # Una referencia adelantada sin resolver deja el modelo incompleto
+    incomplete = [
+        name for name in models.__all__
+        if isinstance(getattr(models, name), type)
+        and issubclass(getattr(models, name), BaseModel)
+        and not getattr(models, name).__pydantic_complete__
+    ]
+    assert incomplete == []
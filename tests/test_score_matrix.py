@@ -0,0 +1,32 @@
+"""
+score_matrix conserva los porcentajes del cálculo escalar original
+"""
+import random
+
+import numpy as np
+
+from app.services.matching import MATCH_WEIGHTS, WEIGHT_VECTOR, score_matrix
+from app.models.match import DESGLOSE_FIELDS
+
+
+def scalar_match(row) -> float:
+    """Cálculo original de calculate_overall_match (suma en orden y round)"""
+    total = 0.0
+    for field, value in zip(DESGLOSE_FIELDS, row):
+        total += value * MATCH_WEIGHTS[field]
+    return round(total * 100, 2)
+
+
+def test_score_matrix_matches_scalar_rounding():
+    # Caso reportado: el redondeo del producto matricial podía dar 25.38
+    assert score_matrix(np.array([[0, 0, 0, 0.125, 1.0, 0.8, 0.9]])).tolist() == [25.37]
+
+
+def test_score_matrix_matches_scalar_path_on_realistic_desgloses():
+    values = [0, 0.125, 0.25, 1 / 3, 0.5, 2 / 3, 0.75, 0.8, 0.9, 1.0]
+    rng = random.Random(7)
+    rows = [[rng.choice(values) for _ in DESGLOSE_FIELDS] for _ in range(5000)]
+    
+    scores = score_matrix(np.array(rows), WEIGHT_VECTOR)
+    
+    assert scores.tolist() == [scalar_match(row) for row in rows]
@@ -0,0 +1,55 @@
+"""
+Los modelos *InDB aceptan documentos ya guardados; las restricciones nuevas
+solo aplican a los modelos de entrada
+"""
+import pytest
+from bson import ObjectId
+from pydantic import ValidationError
+
+from app.models.student import StudentInDB, StudentProfile, StudentUpdate
+from app.models.user import UserCreate, UserInDB
+
+
+def stored_student(**overrides) -> dict:
+    """Documento de estudiante tal como puede estar en la colección students"""
+    doc = {
+        "_id": ObjectId(),
+        "user_id": ObjectId(),
+        "matricula": "A01234567",
+        "nombre_completo": "Juan Pérez García",
+        "carrera": "Ingeniería en Sistemas Computacionales",
+        "semestre": 8
+    }
+    doc.update(overrides)
+    return doc
+
+
+@pytest.mark.parametrize("modalidad", ["hibrido", "remoto", "Mixta"])
+def test_student_in_db_accepts_legacy_modalidad(modalidad):
+    student = StudentInDB(**stored_student(modalidad_preferida=modalidad))
+    assert student.modalidad_preferida == modalidad
+
+
+def test_input_models_reject_unknown_modalidad():
+    with pytest.raises(ValidationError):
+        StudentUpdate(modalidad_preferida="hibrido")
+    with pytest.raises(ValidationError):
+        StudentProfile(**stored_student(modalidad_preferida="hibrido"))
+
+
+def test_user_create_rejects_unknown_role():
+    with pytest.raises(ValidationError):
+        UserCreate(email="a@x.com", username="juan", password="12345678", role="root")
+
+
+@pytest.mark.parametrize("email", ["josé@universidad.mx", "ana@bücher.de", "rh@empresa.xn--p1ai"])
+def test_user_in_db_accepts_stored_emails(email):
+    user = UserInDB(
+        _id=ObjectId(), email=email, username="juan", role="estudiante", hashed_password="x"
+    )
+    assert user.email == email
+
+
+def test_user_create_lowercases_email_domain():
+    user = UserCreate(email="Juan.Perez@Universidad.EDU.mx", username="juan", password="12345678", role="estudiante")
+    assert user.email == "Juan.Perez@universidad.edu.mx"